@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Arabic text normalization for title_ar / description_ar.
+
+normalize_ar() makes one str.translate pass over a precompiled table:
+
+- diacritics (tashkeel, superscript alef, Quranic annotation marks) and
+  tatweel are deleted;
+- alef with hamza / madda / wasla (أ إ آ ٱ) becomes bare alef (ا);
+- alef maqsura and Farsi yeh (ى ی) become yaa (ي);
+- taa marbuta (ة) becomes haa (ه).
+
+Everything else, Latin text and digits included, is left as is.
+tokenize() splits normalized text into casefolded word tokens, and
+text_key() joins them into the spacing- and punctuation-insensitive form
+dedupe_variants.py --normalized and dq_report.py --normalized compare.
+
+build_dataset.py --normalize-text adds the NORM_COLUMNS to every clean row
+during validation. For an existing JSONL (e.g. the released dataset):
+
+    arabic_norm.py dataset_clean.jsonl dataset_norm.jsonl --workers 4 --cache-dir .norm_cache
+
+Chunks are normalized in parallel and, with --cache-dir, stored under the
+hash of their input bytes, so re-running on a grown file only processes
+the new chunks.
+"""
+import argparse, hashlib, os, re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from jsonl_io import dumps_line, loads
+
+# Source text field -> normalized column
+NORM_COLUMNS = {"title_ar": "title_ar_norm", "description_ar": "description_ar_norm"}
+
+_DELETE = [*range(0x0610, 0x061B), *range(0x064B, 0x0660), 0x0670, 0x0640,
+           *range(0x06D6, 0x06DD), *range(0x06DF, 0x06E5), 0x06E7, 0x06E8, *range(0x06EA, 0x06EE)]
+NORM_TABLE = str.maketrans({
+    **dict.fromkeys(map(chr, _DELETE), None),
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ی": "ي",
+    "ة": "ه",
+})
+_TOKEN = re.compile(r"[^\W_]+")
+# Lines per unit of work handed to a worker
+CHUNK_LINES = 20_000
+
+
+def normalize_ar(text) -> str:
+    return text.translate(NORM_TABLE) if isinstance(text, str) else ""
+
+
+def tokenize(text) -> list:
+    return _TOKEN.findall(normalize_ar(text).casefold())
+
+
+def text_key(text) -> str:
+    return " ".join(tokenize(text))
+
+
+def add_normalized(obj):
+    """Set the NORM_COLUMNS of obj from its text fields, in place."""
+    for src, col in NORM_COLUMNS.items():
+        obj[col] = normalize_ar(obj.get(src))
+    return obj
+
+
+def normalize_chunk(lines) -> str:
+    return "".join(dumps_line(add_normalized(loads(line))) for line in lines if line.strip())
+
+
+def chunk_key(lines) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for line in lines:
+        h.update(line.encode("utf-8"))
+    return h.hexdigest()
+
+
+def iter_normalized(f, workers=1, cache_dir=None):
+    """Normalized text of each chunk of f, in input order; cached chunks are read back instead."""
+    def cached(key):
+        path = os.path.join(cache_dir, key + ".jsonl")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as cf:
+                return cf.read()
+        return None
+
+    def store(key, text):
+        if cache_dir:
+            tmp = os.path.join(cache_dir, key + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as cf:
+                cf.write(text)
+            os.replace(tmp, os.path.join(cache_dir, key + ".jsonl"))
+        return text
+
+    chunks = iter(lambda: list(islice(f, CHUNK_LINES)), [])
+    if workers <= 1:
+        for chunk in chunks:
+            key = chunk_key(chunk) if cache_dir else None
+            text = cached(key) if key else None
+            yield text if text is not None else store(key, normalize_chunk(chunk))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        for chunk in chunks:
+            key = chunk_key(chunk) if cache_dir else None
+            text = cached(key) if key else None
+            pending.append((key, text if text is not None else ex.submit(normalize_chunk, chunk)))
+            if len(pending) >= 2 * workers:
+                key, res = pending.popleft()
+                yield res if isinstance(res, str) else store(key, res.result())
+        while pending:
+            key, res = pending.popleft()
+            yield res if isinstance(res, str) else store(key, res.result())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add normalized Arabic text columns to a ticket JSONL.")
+    parser.add_argument("input", help="Input JSONL")
+    parser.add_argument("output", help="Output JSONL")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes; output is identical for any value")
+    parser.add_argument("--cache-dir", default=None, help="Reuse chunks already normalized, keyed by content hash")
+    args = parser.parse_args()
+    if args.cache_dir:
+        os.makedirs(args.cache_dir, exist_ok=True)
+    outp = Path(args.output)
+    outp.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.input, "r", encoding="utf-8") as fi, outp.open("w", encoding="utf-8") as fo:
+        for text in iter_normalized(fi, args.workers, args.cache_dir):
+            fo.write(text)
+
+
+if __name__ == "__main__":
+    main()
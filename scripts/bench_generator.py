@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: generate_tickets_local.py engines, gen() vs the NumPy gen_fast().
+
+Writes ROWS tickets with each engine to a temp file, checks every fast-engine
+line re-encodes to itself through jsonl_io.dumps (same JSON layout as gen())
+and that the two outputs have the same category and tag-count spread, then
+prints tickets/second for each.
+
+The speedup depends on shard size: gen_fast builds its lookup tables (about
+50 ms) once per process, which dominates small shards. The benchmark also
+times ROWS/100 and ROWS/10, and reports each size with the table build
+counted (a process's first shard) and without it (every later shard).
+
+Usage: bench_generator.py [TAXONOMY_JSON=taxonomy_itsm_v1.json] [ROWS=1000000]
+"""
+import os, sys, tempfile, time
+from collections import Counter
+from pathlib import Path
+
+from generate_tickets_local import fast_tables, gen, gen_fast, load_taxonomy
+from jsonl_io import dumps, loads
+
+
+def run(engine, combos, rows, path):
+    t0 = time.perf_counter()
+    engine("001", rows, path, seed=0, combos=combos)
+    return time.perf_counter() - t0
+
+
+def profile(path, check_layout=False):
+    """(category counts, tag-count counts) of a generated file."""
+    cats, ks = Counter(), Counter()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            obj = loads(line)
+            if check_layout and dumps(obj) + "\n" != line:
+                raise SystemExit(f"gen_fast line does not match dumps(): {line[:120]}")
+            cats[obj["category_path"]] += 1
+            ks[len(obj["tags"])] += 1
+    return cats, ks
+
+
+def main():
+    taxonomy = sys.argv[1] if len(sys.argv) > 1 else "taxonomy_itsm_v1.json"
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    combos = load_taxonomy(Path(taxonomy))
+
+    t0 = time.perf_counter()
+    fast_tables(combos, "gemini-3-flash", "Egyptian")
+    t_tables = time.perf_counter() - t0
+    sizes = sorted({max(1, rows // 100), max(1, rows // 10), rows})
+
+    fd_ref, ref_path = tempfile.mkstemp(suffix=".jsonl")
+    fd_fast, fast_path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd_ref); os.close(fd_fast)
+    try:
+        timings = []
+        for n in sizes:
+            t_ref = run(gen, combos, n, Path(ref_path))
+            t_fast = run(gen_fast, combos, n, Path(fast_path))
+            timings.append((n, t_ref, t_fast))
+
+        ref_cats, ref_ks = profile(ref_path)
+        fast_cats, fast_ks = profile(fast_path, check_layout=True)
+        if set(ref_cats) != set(fast_cats) or set(ref_ks) != set(fast_ks):
+            raise SystemExit("engines cover different categories / tag counts")
+    finally:
+        os.remove(ref_path)
+        os.remove(fast_path)
+
+    print(f"gen_fast table build: {t_tables * 1000:.0f} ms (once per process)")
+    print(f"{'rows':>9}  {'python t/s':>11}  {'numpy t/s':>11}  {'speedup':>7}  {'+tables':>7}")
+    for n, t_ref, t_fast in timings:
+        print(f"{n:>9,}  {n / t_ref:>11,.0f}  {n / t_fast:>11,.0f}  {t_ref / t_fast:>6.2f}x  {t_ref / (t_fast + t_tables):>6.2f}x")
+    for k in sorted(ref_ks):
+        print(f"  {k} tags: python {ref_ks[k] / rows:.3f}  numpy {fast_ks[k] / rows:.3f}")
+
+
+if __name__ == "__main__":
+    main()
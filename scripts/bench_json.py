@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON line decode/encode backends in jsonl_io.
+
+Decodes every line of a real part with each available backend (the stdlib
+plus msgspec/orjson when installed) and encodes the parsed tickets with
+json.dumps(..., ensure_ascii=False) vs jsonl_io.dumps. It then does the
+same on a synthetic part of ROWS tickets, which is streamed to a temp file
+so memory stays flat. Decoded objects must equal json.loads' result and
+encoded lines must be byte-identical, or the run fails.
+
+Usage: bench_json.py [PART_JSONL=parts/part_001.jsonl] [ROWS=1000000] [TAXONOMY_JSON]
+"""
+import json, os, random, sys, tempfile, time
+
+from jsonl_io import BACKENDS, make_loads, dumps
+from build_dataset import load_taxonomy
+from bench_validator import make_batch
+
+CHUNK = 50_000
+
+
+def read_chunks(path):
+    """Lists of up to CHUNK non-blank lines of a JSONL file."""
+    chunk = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                chunk.append(line)
+                if len(chunk) == CHUNK:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def timed(fn, items):
+    t0 = time.perf_counter()
+    out = [fn(x) for x in items]
+    return time.perf_counter() - t0, out
+
+
+def bench_file(label, path):
+    decoders = {name: make_loads(name) for name in BACKENDS}
+    encoders = {"json.dumps": lambda o: json.dumps(o, ensure_ascii=False), "jsonl_io.dumps": dumps}
+    t_dec = dict.fromkeys(decoders, 0.0)
+    t_enc = dict.fromkeys(encoders, 0.0)
+    rows = 0
+    for lines in read_chunks(path):
+        ref = None
+        for name, fn in decoders.items():
+            t, objs = timed(fn, lines)
+            t_dec[name] += t
+            if ref is None:
+                ref = [json.loads(l) for l in lines]
+            if objs != ref:
+                raise SystemExit(f"{name} decodes differently from json.loads")
+        out = None
+        for name, fn in encoders.items():
+            t, encoded = timed(fn, ref)
+            t_enc[name] += t
+            if out is not None and encoded != out:
+                raise SystemExit(f"{name} encodes differently from json.dumps")
+            out = encoded
+        rows += len(lines)
+
+    print(f"== {label}: {rows} rows ==")
+    base = t_dec["stdlib"]
+    for name, t in t_dec.items():
+        print(f"decode {name:<15}{rows / t:>12,.0f} rows/s  ({base / t:.2f}x)")
+    base = t_enc["json.dumps"]
+    for name, t in t_enc.items():
+        print(f"encode {name:<15}{rows / t:>12,.0f} rows/s  ({base / t:.2f}x)")
+
+
+def main():
+    part = sys.argv[1] if len(sys.argv) > 1 else "parts/part_001.jsonl"
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    taxonomy = sys.argv[3] if len(sys.argv) > 3 else "taxonomy_itsm_v1.json"
+
+    if os.path.exists(part):
+        bench_file(part, part)
+    else:
+        print(f"Skipping real part: {part} not found")
+
+    _, triple_meta = load_taxonomy(taxonomy)
+    rng = random.Random(0)
+    fd, tmp = tempfile.mkstemp(suffix=".jsonl")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            done = 0
+            while done < total:
+                for obj in make_batch(rng, sorted(triple_meta), min(CHUNK, total - done)):
+                    f.write(dumps(obj) + "\n")
+                done += min(CHUNK, total - done)
+        bench_file("synthetic", tmp)
+    finally:
+        os.remove(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: build_dataset.merge_fixes, line scan vs build cache offset index.
+
+Writes a synthetic part of ROWS tickets, merges FIXES replacements into it
+(half of them for ticket_ids in the part, half appended) through both paths,
+checks the two results are byte-identical and that every line parses, then
+prints the time for each.
+
+Edge cases are checked first on small parts: a last line without a trailing
+newline that is itself swapped while other fixes are appended, and CRLF
+line endings.
+
+Usage: bench_merge_fixes.py [ROWS=200000] [FIXES=1000]
+"""
+import json, os, shutil, sys, tempfile, time
+
+from build_dataset import merge_fixes
+from jsonl_io import dumps
+
+
+def ticket_line(tid: str, note: str = "") -> bytes:
+    return dumps({"ticket_id": tid, "title_ar": f"مشكلة {tid}", "note": note}).encode("utf-8")
+
+
+def write_part(path: str, ids, newline: bytes = b"\n", terminated: bool = True) -> dict:
+    """Write one line per id; returns a build cache entry with their offsets."""
+    entry = {"clean": [], "rejected": []}
+    with open(path, "wb") as f:
+        for i, tid in enumerate(ids):
+            entry["clean"].append([i + 1, f.tell(), tid])
+            f.write(ticket_line(tid))
+            if terminated or i < len(ids) - 1:
+                f.write(newline)
+    return entry
+
+
+def merged(path: str, replacements, entry) -> bytes:
+    merge_fixes(path, replacements, entry)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def check_lines(data: bytes, expect_ids):
+    ids = [json.loads(line)["ticket_id"] for line in data.splitlines() if line.strip()]
+    if ids != expect_ids:
+        raise SystemExit(f"merged ids differ: {ids[:5]}... vs {expect_ids[:5]}...")
+
+
+def check_edge_cases(tmp_dir: str):
+    ids = ["T-1", "T-2", "T-3"]
+    cases = [
+        ("unterminated last line, swapped, with appends", b"\n", False),
+        ("terminated part, swapped last line, with appends", b"\n", True),
+        ("CRLF part", b"\r\n", True),
+        ("unterminated CRLF part", b"\r\n", False),
+    ]
+    fixes = {"T-3": ticket_line("T-3", "fixed"), "T-9": ticket_line("T-9", "new"), "T-8": ticket_line("T-8", "new")}
+    for name, newline, terminated in cases:
+        outputs = []
+        for use_entry in (False, True):
+            path = os.path.join(tmp_dir, "edge.jsonl")
+            entry = write_part(path, ids, newline, terminated)
+            outputs.append(merged(path, fixes, entry if use_entry else None))
+        if outputs[0] != outputs[1]:
+            raise SystemExit(f"{name}: line scan and offset index disagree")
+        try:
+            check_lines(outputs[0], ids + ["T-9", "T-8"])
+        except ValueError as e:
+            raise SystemExit(f"{name}: merged part is not valid JSONL ({e})")
+        if b'"note": "fixed"' not in outputs[0].splitlines()[2]:
+            raise SystemExit(f"{name}: last line was not swapped")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    n_fixes = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        check_edge_cases(tmp_dir)
+
+        ids = [f"TCKT-001-{i:06d}" for i in range(rows)]
+        step = max(1, rows // max(1, n_fixes // 2))
+        fixes = {tid: ticket_line(tid, "fixed") for tid in ids[::step][:n_fixes // 2]}
+        fixes.update((f"TCKT-999-{i:06d}", ticket_line(f"TCKT-999-{i:06d}", "new")) for i in range(n_fixes - len(fixes)))
+
+        base = os.path.join(tmp_dir, "base.jsonl")
+        entry = write_part(base, ids)
+        timings, outputs = [], []
+        for use_entry in (False, True):
+            path = os.path.join(tmp_dir, "part.jsonl")
+            shutil.copyfile(base, path)
+            t0 = time.perf_counter()
+            merge_fixes(path, fixes, entry if use_entry else None)
+            timings.append(time.perf_counter() - t0)
+            with open(path, "rb") as f:
+                outputs.append(f.read())
+        if outputs[0] != outputs[1]:
+            raise SystemExit("line scan and offset index produced different parts")
+        check_lines(outputs[0], ids + [tid for tid in fixes if tid.startswith("TCKT-999-")])
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    print(f"Rows: {rows}, fixes: {len(fixes)}")
+    print(f"line scan:    {timings[0] * 1000:>8.1f} ms")
+    print(f"offset index: {timings[1] * 1000:>8.1f} ms  ({timings[0] / timings[1]:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
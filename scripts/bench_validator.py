@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: validate_row vs the precompiled RowValidator.
+
+Builds a synthetic corpus in memory (mostly valid rows plus ~10% with one
+corrupted field), checks both validators return identical error lists, and
+prints rows/second for each. Every rejected row also goes through
+repair_row (with a TaxonomyResolver) once, which must not raise.
+
+Usage: bench_validator.py [TAXONOMY_JSON] [ROWS=1000000]
+"""
+import sys, time, random
+from datetime import datetime, timedelta, timezone
+
+from build_dataset import load_taxonomy, validate_row, RowValidator, compute_priority, repair_row
+from taxonomy_resolver import TaxonomyResolver
+
+BATCH = 10_000
+REPEATS = 7
+
+CORRUPTIONS = [
+    lambda o: o.update(channel="EMAIL"),
+    lambda o: o.update(sentiment="angry"),
+    lambda o: o.update(impact="3"),
+    lambda o: o.update(priority=0),
+    lambda o: o.update(priority=o["priority"] % 5 + 1),
+    lambda o: o.update(updated_at="2026-01-01T00:00:00+02:00"),
+    lambda o: o.update(created_at="2026-13-01T00:00:00+02:00"),
+    lambda o: o.update(category_path="Network > WiFi > Printer"),
+    lambda o: o.update(category_level_3="Excel Crash"),
+    lambda o: o.update(category_level_3="Excel Crash", category_path=None),
+    lambda o: o.update(category_level_2=[o["category_level_2"]]),
+    lambda o: o.update(tags="wifi"),
+    lambda o: o.update(labels_json={"l1": o["category_level_1"]}),
+    lambda o: o.pop("model"),
+]
+
+
+def make_batch(rng, triples, n):
+    tz = timezone(timedelta(hours=2))
+    rows = []
+    for i in range(n):
+        l1, l2, l3 = rng.choice(triples)
+        created = datetime(2026, 2, rng.randint(1, 20), rng.randint(0, 23), rng.randint(0, 59), tzinfo=tz)
+        updated = created + timedelta(minutes=rng.randint(0, 72 * 60))
+        impact = rng.randint(1, 5); urgency = rng.randint(1, 5)
+        tags = ["wifi", "vpn", "error"][:rng.randint(2, 3)]
+        obj = {
+            "ticket_id": f"TCKT-BENCH-{i:07d}",
+            "created_at": created.isoformat(timespec="seconds"),
+            "updated_at": updated.isoformat(timespec="seconds"),
+            "channel": rng.choice(["email", "portal", "chatbot", "phone"]),
+            "model": "bench",
+            "dialect": "Egyptian",
+            "title_ar": "مشكلة",
+            "description_ar": "وصف المشكلة",
+            "category_level_1": l1,
+            "category_level_2": l2,
+            "category_level_3": l3,
+            "category_path": f"{l1} > {l2} > {l3}",
+            "tags": tags,
+            "labels_json": {"l1": l1, "l2": l2, "l3": l3, "tags": tags},
+            "impact": impact,
+            "urgency": urgency,
+            "priority": compute_priority(impact, urgency),
+            "sentiment": rng.choice(["positive", "neutral", "negative", "mixed"]),
+        }
+        if rng.random() < 0.1:
+            rng.choice(CORRUPTIONS)(obj)
+        rows.append(obj)
+    return rows
+
+
+def main():
+    taxonomy = sys.argv[1] if len(sys.argv) > 1 else "taxonomy_itsm_v1.json"
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    allowed_paths, triple_meta = load_taxonomy(taxonomy)
+    validator = RowValidator(triple_meta)
+    repairer = RowValidator(triple_meta)
+    repairer.resolver = TaxonomyResolver.load(taxonomy)
+    triples = sorted(triple_meta)
+    rng = random.Random(0)
+
+    t_ref = t_new = 0.0
+    done = 0
+    while done < total:
+        batch = make_batch(rng, triples, min(BATCH, total - done))
+
+        # Best of REPEATS per batch, alternating, to keep scheduler noise out
+        best_ref = best_new = float("inf")
+        for _ in range(REPEATS):
+            t0 = time.perf_counter()
+            ref = [validate_row(o, allowed_paths) for o in batch]
+            t1 = time.perf_counter()
+            new = [validator(o) for o in batch]
+            t2 = time.perf_counter()
+            best_ref = min(best_ref, t1 - t0)
+            best_new = min(best_new, t2 - t1)
+
+        if ref != new:
+            raise SystemExit("RowValidator disagrees with validate_row")
+        for o, errs in zip(batch, ref):
+            if errs:
+                repair_row(o, errs, repairer)
+        t_ref += best_ref
+        t_new += best_new
+        done += len(batch)
+
+    print(f"Rows: {done}")
+    print(f"validate_row:  {done / t_ref:>12,.0f} rows/s")
+    print(f"RowValidator:  {done / t_new:>12,.0f} rows/s  ({t_ref / t_new:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
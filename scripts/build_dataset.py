@@ -1,11 +1,34 @@
 import json
+import csv
 import glob
+import hashlib
 import argparse
 import os
+import pickle
+import re
+import shutil
+import tempfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice, repeat
+from operator import itemgetter
 from datetime import datetime
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import pandas as pd
 
+from arabic_norm import NORM_COLUMNS, add_normalized
+from dq_stats import DQStats, PARTIAL_VERSION, part_stats
+from jsonl_io import dumps, dumps_line, iter_jsonl, loads
+from ticket import TICKET_KEYS, Labels
+from taxonomy_resolver import DEFAULT_THRESHOLD, TaxonomyResolver
+from ticket_store import build_index, default_index_path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for --out-parquet
+    pa = pq = None
+
 # ---------- CLI ----------
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -23,6 +46,18 @@ def parse_args():
         "--out-jsonl", default="dataset_clean.jsonl",
         help="Output path for clean JSONL (default: dataset_clean.jsonl)"
     )
+    parser.add_argument(
+        "--out-parquet", default="dataset_clean.parquet",
+        help="Output Parquet path, with native tags/labels_json types (needs pyarrow; '' to skip)"
+    )
+    parser.add_argument(
+        "--parquet-row-group-size", type=int, default=PARQUET_ROW_GROUP_SIZE,
+        help=f"Max rows per Parquet row group, and rows buffered for Parquet across categories; each group holds a single category_level_1 (default: {PARQUET_ROW_GROUP_SIZE})"
+    )
+    parser.add_argument(
+        "--out-index", default=None,
+        help="ticket_id index for the clean JSONL, read by ticket_store.py (default: next to --out-jsonl as .idx; '' to skip)"
+    )
     parser.add_argument(
         "--out-csv", default="dataset_clean.csv",
         help="Output path for clean CSV (default: dataset_clean.csv)"
@@ -35,6 +70,38 @@ def parse_args():
         "--apply-fixes", action="store_true",
         help="Before building, merge *_fixed.jsonl rows into their original part files, then delete the fixed and rejected files"
     )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Validate and write JSONL, CSV and rejects row-by-row without holding the dataset in memory"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Validate part files (and byte ranges of large parts) in N worker processes (default: 1)"
+    )
+    parser.add_argument(
+        "--dq-report", default=None,
+        help="Also write the dq_report.py quality report, computed during validation, to this path"
+    )
+    parser.add_argument(
+        "--dq-sketch", action="store_true",
+        help="Estimate the --dq-report duplicate stats in fixed memory (dq_report.py --sketch)"
+    )
+    parser.add_argument(
+        "--resolve-categories", action="store_true",
+        help="Repair category triples outside the taxonomy with the nearest allowed one (taxonomy_resolver.py)"
+    )
+    parser.add_argument(
+        "--resolve-threshold", type=float, default=DEFAULT_THRESHOLD,
+        help=f"Minimum resolver confidence for --resolve-categories (default: {DEFAULT_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--normalize-text", action="store_true",
+        help="Add title_ar_norm/description_ar_norm columns (arabic_norm.py) to the outputs; --dq-report then measures normalized text"
+    )
+    parser.add_argument(
+        "--cache-dir", default=None,
+        help="Keep per-part validation results here and reuse them for unchanged parts (implies --stream writing)"
+    )
     return parser.parse_args()
 
 # ---------- Taxonomy ----------
@@ -54,13 +121,7 @@ def load_taxonomy(path: str) -> Tuple[set, Dict[Tuple[str,str,str], Dict[str, An
     return allowed_paths, triple_meta
 
 # ---------- Validation ----------
-REQUIRED_KEYS = [
-    "ticket_id", "created_at", "updated_at", "channel", "model",
-    "dialect", "title_ar", "description_ar",
-    "category_level_1", "category_level_2", "category_level_3", "category_path",
-    "tags", "labels_json",
-    "impact", "urgency", "priority", "sentiment"
-]
+REQUIRED_KEYS = list(TICKET_KEYS)
 
 ALLOWED_CHANNELS = {"email", "portal", "chatbot", "phone"}
 ALLOWED_SENTIMENT = {"positive", "neutral", "negative", "mixed"}
@@ -129,7 +190,7 @@ def validate_row(obj: Dict[str, Any], allowed_paths: set) -> List[str]:
 
     # labels_json
     lj = obj["labels_json"]
-    if not isinstance(lj, dict):
+    if not isinstance(lj, (dict, Labels)):
         errors.append("bad:labels_json_type")
     else:
         for k in ["l1", "l2", "l3", "tags"]:
@@ -144,9 +205,354 @@ def validate_row(obj: Dict[str, Any], allowed_paths: set) -> List[str]:
 
     return errors
 
+# Timestamps in the generation contract's fixed shape, e.g. 2026-02-14T10:23:00+02:00
+_TS_LEN = 25
+_TS_SEPARATORS = ((4, "-"), (7, "-"), (10, "T"), (13, ":"), (16, ":"), (22, ":"))
+# Upper bound on remembered timestamp strings; the set is simply reset when full
+TS_CACHE_SIZE = 1 << 16
+
+class RowValidator:
+    """validate_row compiled once against a taxonomy.
+
+    Returns exactly the error codes validate_row returns, in the same order,
+    but does the per-schema work up front: all required fields are fetched
+    with one itemgetter call, category paths come from a triple -> path dict
+    built from load_taxonomy's triple_meta, in-range impact/urgency pairs map
+    straight to their expected priority, and timestamps already seen in the
+    fixed YYYY-MM-DDTHH:MM:SS+HH:MM shape are remembered so two of them with
+    the same offset are compared as strings instead of being parsed.
+    """
+
+    LABEL_KEYS = ("l1", "l2", "l3", "tags")
+    LABEL_KEY_SET = frozenset(LABEL_KEYS)
+    CHANNELS = frozenset(ALLOWED_CHANNELS)
+    SENTIMENTS = frozenset(ALLOWED_SENTIMENT)
+    # Expected priority for every in-range (impact, urgency) pair
+    PRIORITY = {(i, u): compute_priority(i, u) for i in range(1, 6) for u in range(1, 6)}
+
+    def __init__(self, triple_meta: Dict[Tuple[str, str, str], Dict[str, Any]]):
+        self.path_of = {t: f"{t[0]} > {t[1]} > {t[2]}" for t in triple_meta}
+        self._fields = itemgetter(*REQUIRED_KEYS)
+        self.allowed_paths = frozenset(self.path_of.values())
+        self._fixed_ts = set()
+        # Optional TaxonomyResolver for the category_resolver repair rule
+        self.resolver: Optional[TaxonomyResolver] = None
+        # Add the arabic_norm.NORM_COLUMNS to clean rows (--normalize-text)
+        self.normalize_text = False
+
+    def __call__(self, obj: Dict[str, Any]) -> List[str]:
+        try:
+            (_, created, updated, channel, _, _, _, _,
+             l1, l2, l3, path, tags, lj,
+             impact, urgency, priority, sentiment) = self._fields(obj)
+        except KeyError:
+            return [f"missing:{k}" for k in REQUIRED_KEYS if k not in obj]
+
+        errors = []
+
+        if channel not in self.CHANNELS:
+            errors.append("bad:channel")
+        if sentiment not in self.SENTIMENTS:
+            errors.append("bad:sentiment")
+
+        # impact/urgency/priority: one lookup when all three are plain ints in 1..5
+        if int is type(impact) is type(urgency) is type(priority) and (impact, urgency) in self.PRIORITY \
+                and 1 <= priority <= 5:
+            priority_ok = self.PRIORITY[impact, urgency] == priority
+        else:
+            ints = True
+            for k, v in (("impact", impact), ("urgency", urgency), ("priority", priority)):
+                if not isinstance(v, int):
+                    errors.append(f"bad:type:{k}")
+                    ints = False
+                elif v < 1 or v > 5:
+                    errors.append(f"bad:range:{k}")
+            priority_ok = not ints or compute_priority(impact, urgency) == priority
+
+        fixed = self._fixed_ts
+        if type(created) is str and type(updated) is str and created in fixed and updated in fixed \
+                and created[19:] == updated[19:]:
+            # Same shape and same UTC offset: string order is time order
+            if updated < created:
+                errors.append("bad:updated_at<created_at")
+        else:
+            ts_error = self.check_timestamps(created, updated)
+            if ts_error:
+                errors.append(ts_error)
+
+        try:
+            expected_path = self.path_of.get((l1, l2, l3))
+        except TypeError:
+            expected_path = None
+        # A None expected_path means the triple is not allowed; compare before
+        # the shortcut so a JSON-null category_path cannot match it
+        if expected_path is None or path != expected_path:
+            if expected_path is None:
+                # Not an allowed triple: the path can only match by accident
+                expected_path = f"{l1} > {l2} > {l3}"
+            if path != expected_path:
+                errors.append("bad:category_path_mismatch")
+            if path not in self.allowed_paths:
+                errors.append("bad:category_not_allowed")
+
+        if not isinstance(tags, list) or not all(map(isinstance, tags, repeat(str))):
+            errors.append("bad:tags")
+
+        if not isinstance(lj, (dict, Labels)):
+            errors.append("bad:labels_json_type")
+        elif not self.LABEL_KEY_SET <= lj.keys():
+            errors.extend(f"bad:labels_json_missing:{k}" for k in self.LABEL_KEYS if k not in lj)
+
+        if not priority_ok:
+            errors.append("bad:priority_rule")
+
+        return errors
+
+    def check_timestamps(self, created: Any, updated: Any) -> Optional[str]:
+        """Parse both timestamps, remembering the ones in the fixed shape."""
+        try:
+            c = parse_iso(created)
+            u = parse_iso(updated)
+            if u < c:
+                return "bad:updated_at<created_at"
+        except Exception:
+            return "bad:timestamp"
+
+        fixed = self._fixed_ts
+        if len(fixed) >= TS_CACHE_SIZE:
+            fixed.clear()
+        for ts in (created, updated):
+            if len(ts) == _TS_LEN and ts[19] in "+-" and all(ts[i] == ch for i, ch in _TS_SEPARATORS):
+                fixed.add(ts)
+        return None
+
+# ---------- Repair rules ----------
+# Mechanical errors fixed inline during validation instead of going to the
+# fixer. A rule is (name, error codes it answers, fix); fix edits a plain
+# dict copy of the row and returns False when it cannot repair it. Rules run
+# in table order, so later ones see earlier repairs (priority after score
+# types, labels_json after the category levels).
+def _int_score(v: Any) -> Any:
+    if isinstance(v, str) and v.strip().isdigit():
+        return int(v.strip())
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+def _fix_score_types(obj: Dict[str, Any], validator: "RowValidator") -> bool:
+    for k in ("impact", "urgency", "priority"):
+        obj[k] = _int_score(obj[k])
+    return all(isinstance(obj[k], int) for k in ("impact", "urgency"))
+
+def _fix_enum_case(obj: Dict[str, Any], validator: "RowValidator") -> bool:
+    ok = True
+    for k, allowed in (("channel", validator.CHANNELS), ("sentiment", validator.SENTIMENTS)):
+        if obj[k] not in allowed:
+            v = obj[k].strip().lower() if isinstance(obj[k], str) else obj[k]
+            obj[k] = v
+            ok &= v in allowed
+    return ok
+
+def _fix_timestamps(obj: Dict[str, Any], validator: "RowValidator") -> bool:
+    obj["created_at"], obj["updated_at"] = obj["updated_at"], obj["created_at"]
+    return True
+
+def _str_levels(obj: Dict[str, Any]) -> Optional[Tuple[str, str, str]]:
+    """The category levels as a triple, or None if any is not a string (and may not be hashable)."""
+    levels = (obj["category_level_1"], obj["category_level_2"], obj["category_level_3"])
+    return levels if all(isinstance(x, str) for x in levels) else None
+
+def _fix_category_path(obj: Dict[str, Any], validator: "RowValidator") -> bool:
+    levels = _str_levels(obj)
+    if levels not in validator.path_of:
+        # The path may be the right half: take the levels from it
+        levels = tuple(p.strip() for p in str(obj["category_path"]).split(">"))
+        if levels not in validator.path_of:
+            return False
+        obj["category_level_1"], obj["category_level_2"], obj["category_level_3"] = levels
+        _fix_labels(obj, validator)
+    obj["category_path"] = validator.path_of[levels]
+    return True
+
+def _fix_category_resolve(obj: Dict[str, Any], validator: "RowValidator") -> bool:
+    levels = _str_levels(obj)
+    if validator.resolver is None or levels in validator.path_of:
+        return False
+    # Levels and path may each hold the intended category; keep the more confident match
+    tags = obj.get("tags") or ()
+    matches = [m for m in (levels and validator.resolver.resolve(*levels, tags=tags),
+                           validator.resolver.resolve_path(obj["category_path"], tags=tags)) if m is not None]
+    if not matches:
+        return False
+    levels = max(matches, key=lambda m: m[1])[0]
+    obj["category_level_1"], obj["category_level_2"], obj["category_level_3"] = levels
+    obj["category_path"] = validator.path_of[levels]
+    _fix_labels(obj, validator)
+    return True
+
+def _fix_labels(obj: Dict[str, Any], validator: "RowValidator") -> bool:
+    lj = obj["labels_json"]
+    lj = dict(lj) if isinstance(lj, (dict, Labels)) else {}
+    lj.update(l1=obj["category_level_1"], l2=obj["category_level_2"], l3=obj["category_level_3"])
+    lj.setdefault("tags", obj["tags"])
+    obj["labels_json"] = lj
+    return True
+
+def _fix_priority(obj: Dict[str, Any], validator: "RowValidator") -> bool:
+    imp, urg = obj["impact"], obj["urgency"]
+    if not (isinstance(imp, int) and isinstance(urg, int)):
+        return False
+    obj["priority"] = compute_priority(imp, urg)
+    return True
+
+REPAIR_RULES = [
+    ("score_type", {"bad:type:impact", "bad:type:urgency", "bad:type:priority"}, _fix_score_types),
+    ("enum_case", {"bad:channel", "bad:sentiment"}, _fix_enum_case),
+    ("swapped_timestamps", {"bad:updated_at<created_at"}, _fix_timestamps),
+    ("category_path", {"bad:category_path_mismatch", "bad:category_not_allowed"}, _fix_category_path),
+    # Only with a validator.resolver (--resolve-categories), for triples neither side of which is allowed
+    ("category_resolver", {"bad:category_path_mismatch", "bad:category_not_allowed"}, _fix_category_resolve),
+    ("labels_json", {"bad:labels_json_type"} | {f"bad:labels_json_missing:{k}" for k in RowValidator.LABEL_KEYS}, _fix_labels),
+    ("priority", {"bad:priority_rule", "bad:range:priority", "bad:type:priority"}, _fix_priority),
+]
+REPAIR_CODES = frozenset(c for _, codes, _ in REPAIR_RULES for c in codes)
+
+def apply_repairs(obj: Dict[str, Any], errs: List[str], validator: "RowValidator") -> Tuple[Dict[str, Any], List[str]]:
+    """Dict copy of obj with every rule answering one of errs applied, and the names of those that succeeded."""
+    fixed = dict(obj)
+    if any(k not in fixed for k in REQUIRED_KEYS):
+        return fixed, []
+    codes = set(errs)
+    applied = []
+    for name, rule_codes, fix in REPAIR_RULES:
+        if codes & rule_codes and fix(fixed, validator):
+            applied.append(name)
+    return fixed, applied
+
+def repair_row(obj: Dict[str, Any], errs: List[str], validator: "RowValidator") -> Optional[Tuple[Dict[str, Any], List[str]]]:
+    """(repaired copy, rule names) if rules answer every error in errs and the copy then validates, else None."""
+    if not errs or not REPAIR_CODES.issuperset(errs):
+        return None
+    fixed, applied = apply_repairs(obj, errs, validator)
+    return (fixed, applied) if applied and not validator(fixed) else None
+
 # ---------- Apply fixes ----------
-def apply_fixes(input_glob: str, rejected_path: str):
-    """Merge *_fixed.jsonl back into originals, then delete fixed + rejected files."""
+# Cheap ticket_id peek so unchanged lines are copied without being parsed
+_TICKET_ID_RE = re.compile(rb'"ticket_id"\s*:\s*"([^"\\]*)"')
+COPY_CHUNK = 1 << 20
+
+
+def load_fixes(fixed_path: str) -> Dict[str, bytes]:
+    """ticket_id -> fixed line (stripped, no newline); a later fix for the same id wins."""
+    replacements: Dict[str, bytes] = {}
+    with open(fixed_path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                replacements[loads(line)["ticket_id"]] = line
+            except Exception:
+                pass
+    return replacements
+
+
+def line_ticket_id(line: bytes, wanted: Dict[str, bytes]) -> Optional[str]:
+    """ticket_id of a JSONL line if it is one of wanted, else None.
+
+    Only lines whose peeked ticket_id is wanted (or cannot be peeked, e.g. an
+    escaped id) are actually parsed.
+    """
+    ids = _TICKET_ID_RE.findall(line)
+    if len(ids) == line.count(b'"ticket_id"') and not any(i.decode("utf-8", "replace") in wanted for i in ids):
+        return None
+    try:
+        tid = loads(line).get("ticket_id")
+    except Exception:
+        return None
+    return tid if isinstance(tid, str) and tid in wanted else None
+
+
+def indexed_fix_offsets(entry: Dict[str, Any], wanted: Dict[str, bytes]) -> List[Tuple[int, str]]:
+    """(offset, ticket_id) of the first line for each wanted id, from a build cache entry."""
+    first: Dict[str, int] = {}
+    for row in chain(entry["clean"], entry["rejected"]):
+        tid = row[2]
+        if isinstance(tid, str) and tid in wanted and (tid not in first or row[1] < first[tid]):
+            first[tid] = row[1]
+    return sorted((off, tid) for tid, off in first.items())
+
+
+def copy_bytes(src, dst, n: int):
+    while n > 0:
+        buf = src.read(min(n, COPY_CHUNK))
+        if not buf:
+            break
+        dst.write(buf)
+        n -= len(buf)
+
+
+def merge_fixes(base: str, replacements: Dict[str, bytes], entry: Optional[Dict[str, Any]] = None) -> Tuple[int, int]:
+    """Rewrite base with fixed lines swapped in by ticket_id; returns (replaced, appended).
+
+    The original is streamed into a temp file next to it, which then replaces
+    it atomically. Unchanged lines are copied byte for byte; only the first
+    line carrying each fixed ticket_id is swapped, and fixes whose ticket_id
+    is not in the part are appended. With a build cache entry for the current
+    content of base, its line offsets are used as the index and the part is
+    copied in chunks without scanning it line by line.
+    """
+    pending = dict(replacements)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(base) or ".", prefix=".merge_", suffix=".tmp")
+    last = b"\n"
+    try:
+        with open(base, "rb") as src, os.fdopen(fd, "wb") as dst:
+
+            def swap(old: bytes, tid: str):
+                ending = old[len(old.rstrip(b"\r\n")):]
+                dst.write(pending.pop(tid) + ending)
+                return ending[-1:]
+
+            if entry is not None:
+                pos = 0
+                for off, tid in indexed_fix_offsets(entry, pending):
+                    copy_bytes(src, dst, off - pos)
+                    last = swap(src.readline(), tid)
+                    pos = src.tell()
+                while True:
+                    buf = src.read(COPY_CHUNK)
+                    if not buf:
+                        break
+                    dst.write(buf)
+                    last = buf[-1:]
+            else:
+                for line in src:
+                    tid = line_ticket_id(line, pending) if pending else None
+                    if tid is None:
+                        dst.write(line)
+                        last = line[-1:]
+                    else:
+                        last = swap(line, tid)
+
+            appended = len(pending)
+            if pending and last != b"\n":
+                dst.write(b"\n")
+            for line in pending.values():
+                dst.write(line + b"\n")
+        shutil.copymode(base, tmp)
+        os.replace(tmp, base)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return len(replacements) - appended, appended
+
+
+def apply_fixes(input_glob: str, rejected_path: str, cache: Optional["BuildCache"] = None):
+    """Merge *_fixed.jsonl back into originals, then delete fixed + rejected files.
+
+    Memory is proportional to the number of fixes, not the part size. With a
+    build cache, parts it still matches are rewritten through its offset index.
+    """
     parts_dir = os.path.dirname(input_glob) or "."
     fixed_files = sorted(glob.glob(os.path.join(parts_dir, "*_fixed.jsonl")))
     if not fixed_files:
@@ -160,140 +566,680 @@ def apply_fixes(input_glob: str, rejected_path: str):
             print(f"Warning: no original found for {fixed_path}, skipping")
             continue
 
-        # Build replacement map: ticket_id -> fixed line
-        replacements = {}
-        with open(fixed_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                    replacements[obj["ticket_id"]] = line
-                except Exception:
-                    pass
-
-        # Read original, replace rows whose ticket_id has a fix
-        merged = []
-        with open(base, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                    tid = obj.get("ticket_id")
-                    if tid in replacements:
-                        merged.append(replacements.pop(tid))
-                    else:
-                        merged.append(line)
-                except Exception:
-                    merged.append(line)
-
-        # Append any fixed rows with new ticket_ids
-        for line in replacements.values():
-            merged.append(line)
-
-        # Write merged back to original
-        with open(base, "w", encoding="utf-8") as f:
-            for line in merged:
-                f.write(line + "\n")
+        replacements = load_fixes(fixed_path)
+        entry = cache.parts.get(base) if cache is not None else None
+        if entry is not None and entry["sha256"] != cache.part_sha256(base):
+            entry = None
+        replaced, appended = merge_fixes(base, replacements, entry)
+        if cache is not None:
+            # The part changed under the cache's memoized hash
+            cache.forget(base)
 
         os.remove(fixed_path)
-        print(f"Merged {fixed_path} -> {base}")
+        print(f"Merged {fixed_path} -> {base} ({replaced} replaced, {appended} appended)")
 
     # Delete stale rejected file
     if os.path.exists(rejected_path):
         os.remove(rejected_path)
         print(f"Deleted {rejected_path}")
 
+# ---------- Pipeline ----------
+# Recommended column order for the CSV release
+CSV_COLUMNS = [
+    "ticket_id", "created_at", "updated_at", "channel", "model",
+    "dialect",
+    "title_ar", "description_ar",
+    "category_level_1", "category_level_2", "category_level_3", "category_path",
+    "tags", "labels_json",
+    "impact", "urgency", "priority", "sentiment"
+]
+
+def output_columns(normalize_text: bool) -> List[str]:
+    """CSV/Parquet columns, with the normalized text columns last under --normalize-text."""
+    return CSV_COLUMNS + list(NORM_COLUMNS.values()) if normalize_text else CSV_COLUMNS
+
+# Parts larger than this are split into line-aligned byte ranges so one big
+# part can still be spread across workers.
+SHARD_BYTES = 32 * 1024 * 1024
+
+Shard = Tuple[str, int, int]
+ShardEntry = Tuple[int, int, Optional[str], Optional[Dict[str, Any]], List[str]]
+# (source, line_no, byte offset) of the row an event came from
+RowMeta = Tuple[str, int, int]
+
+def plan_shards(files: List[str], shard_bytes: int = SHARD_BYTES) -> List[Shard]:
+    """Split the part files into (source, start, end) byte ranges ending on line boundaries."""
+    shards = []
+    for fp in files:
+        size = os.path.getsize(fp)
+        start = 0
+        with open(fp, "rb") as f:
+            while start < size:
+                end = start + shard_bytes
+                if end >= size:
+                    end = size
+                else:
+                    f.seek(end)
+                    f.readline()
+                    end = f.tell()
+                shards.append((fp, start, end))
+                start = end
+        if size == 0:
+            shards.append((fp, 0, 0))
+    return shards
+
+def validate_shard(shard: Shard, validator: RowValidator) -> Tuple[int, List[ShardEntry]]:
+    """Parse and validate one byte range of a part file.
+
+    Returns the number of physical lines in the range and one
+    (line_no, offset, raw, ticket, errors) entry per non-blank line, with
+    line_no relative to the start of the range and offset absolute in the
+    file. raw is only kept for lines that are not valid JSON. The duplicate
+    ticket_id check is left to the caller since it depends on every shard
+    before this one. With validator.normalize_text, rows without errors get
+    their normalized text columns here, so that work is spread over the
+    workers too.
+    """
+    fp, start, end = shard
+    with open(fp, "rb") as f:
+        f.seek(start)
+        chunk = f.read(end - start)
+
+    entries: List[ShardEntry] = []
+    n_lines = 0
+    offset = start
+    # bytes.splitlines() breaks on \n, \r and \r\n, same as text-mode reads
+    for n_lines, raw_line in enumerate(chunk.splitlines(keepends=True), start=1):
+        line_offset = offset
+        offset += len(raw_line)
+        line = raw_line.decode("utf-8").strip()
+        if not line:
+            continue
+        try:
+            obj = loads(line)
+        except Exception:
+            entries.append((n_lines, line_offset, line, None, ["bad:json_parse"]))
+            continue
+        entries.append((n_lines, line_offset, None, obj, validator(obj)))
+
+    if validator.normalize_text:
+        for _, _, _, obj, errs in entries:
+            if obj is not None and not errs:
+                add_normalized(obj)
+
+    return n_lines, entries
+
+def iter_shard_results(shards: List[Shard], validator: RowValidator, workers: int = 1) -> Iterator[Tuple[Shard, Tuple[int, List[ShardEntry]]]]:
+    """Validate shards serially or in a process pool, yielding results in input order."""
+    if workers <= 1:
+        for shard in shards:
+            yield shard, validate_shard(shard, validator)
+        return
+
+    # Keep a bounded window of shards in flight so --stream memory stays flat
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        for shard in shards:
+            pending.append((shard, ex.submit(validate_shard, shard, validator)))
+            if len(pending) >= 2 * workers:
+                done, fut = pending.popleft()
+                yield done, fut.result()
+        while pending:
+            done, fut = pending.popleft()
+            yield done, fut.result()
+
+def check_row(obj: Dict[str, Any], errs: List[str], seen_ids: set, source: str, line: int,
+              validator: RowValidator, repairs: Optional[Counter] = None) -> Tuple[str, Dict[str, Any]]:
+    """Finish one validated row: ("clean", ticket) or ("rejected", record).
+
+    Adds the duplicate ticket_id check against seen_ids (and records the id
+    of clean rows there), applies REPAIR_RULES when they answer every error
+    (counting the rules used into repairs) and tidies the tags of clean rows.
+    With validator.normalize_text, clean rows get the NORM_COLUMNS if
+    validate_shard did not add them already. Rejected records keep the row
+    as it was read.
+    """
+    # Deduplicate ticket_id
+    tid = obj.get("ticket_id")
+    if tid in seen_ids:
+        errs.append("bad:duplicate_ticket_id")
+
+    # Auto-repair mechanical errors
+    repaired = repair_row(obj, errs, validator)
+    if repaired is not None:
+        obj, applied = repaired
+        errs = []
+        if repairs is not None:
+            repairs.update(applied)
+
+    if errs:
+        if validator.normalize_text:
+            for col in NORM_COLUMNS.values():
+                obj.pop(col, None)
+        return "rejected", {"source": source, "line": line, "reason": errs, "ticket": obj}
+
+    seen_ids.add(tid)
+
+    # Make tags stable (trim + lower for english tags)
+    obj["tags"] = [t.strip() for t in obj["tags"] if t and str(t).strip()]
+
+    if validator.normalize_text and NORM_COLUMNS["title_ar"] not in obj:
+        add_normalized(obj)
+
+    return "clean", obj
+
+def iter_validated(files: List[str], validator: RowValidator, workers: int = 1, cache: Optional["BuildCache"] = None,
+                   dq: Optional[DQStats] = None,
+                   repairs: Optional[Counter] = None) -> Iterator[Tuple[str, Any, RowMeta]]:
+    """Yield ("clean", ticket, meta) or ("rejected", record, meta) for every row, in input order.
+
+    With a cache, unchanged parts whose ticket_ids do not collide with
+    anything seen before them come out as a single ("cached", entry, meta)
+    event instead of their rows.
+
+    With dq, every row is also counted into a per-part DQStats as it was
+    read (before the priority fix and tag cleanup), and each part's stats
+    are merged into dq in file order. Cached parts contribute the stats
+    saved with them.
+
+    With repairs, the REPAIR_RULES used on each part are counted into it;
+    cached parts contribute the counts saved with them.
+    """
+    seen_ids = set()
+    entries = {fp: cache.lookup(fp) for fp in files} if cache else {}
+
+    fresh = [fp for fp in files if entries.get(fp) is None]
+    fresh_shards = plan_shards(fresh)
+    n_shards = Counter(fp for fp, _, _ in fresh_shards)
+    fresh_results = iter_shard_results(fresh_shards, validator, workers)
+
+    for fp in files:
+        entry = entries.get(fp)
+        if entry is not None:
+            if seen_ids.isdisjoint(BuildCache.row_ids(entry)):
+                seen_ids.update(BuildCache.clean_ids(entry))
+                if dq is not None:
+                    dq.merge(cache.dq_stats(fp, dq))
+                if repairs is not None:
+                    repairs.update(cache.repairs(fp))
+                yield "cached", entry, (fp, 0, 0)
+                continue
+            # An earlier part now claims some of these ticket_ids; redo this one
+            results = iter_shard_results(plan_shards([fp]), validator)
+        else:
+            results = islice(fresh_results, n_shards[fp])
+
+        part_dq = DQStats(dq.taxonomy, sketch=dq.sketch, normalized=dq.normalized) if dq is not None else None
+        part_repairs = Counter()
+        line_base = 0
+        for _, (n_lines, shard_entries) in results:
+            for rel_line, offset, raw, obj, errs in shard_entries:
+                meta = (fp, line_base + rel_line, offset)
+                if part_dq is not None:
+                    if obj is None:
+                        part_dq.add_unparsed()
+                    else:
+                        part_dq.add(obj)
+                if obj is None:
+                    yield "rejected", {"source": fp, "line": meta[1], "reason": errs, "raw": raw}, meta
+                    continue
+                kind, rec = check_row(obj, errs, seen_ids, fp, meta[1], validator, part_repairs)
+                yield kind, rec, meta
+            line_base += n_lines
+
+        if repairs is not None:
+            repairs.update(part_repairs)
+        if cache is not None:
+            cache.save_repairs(fp, part_repairs)
+
+        if part_dq is not None:
+            dq.merge(part_dq)
+            if cache is not None:
+                cache.save_dq(fp, part_dq)
+
+def csv_row(obj: Dict[str, Any], columns: List[str] = CSV_COLUMNS) -> List[Any]:
+    """Flatten a clean ticket into columns order, serializing tags/labels_json to JSON."""
+    row = []
+    for c in columns:
+        v = obj.get(c)
+        if c in ("tags", "labels_json"):
+            v = dumps(v)
+        row.append("" if v is None else v)
+    return row
+
+def csv_writer(f):
+    # Same dialect DataFrame.to_csv uses, so every write path produces identical files
+    return csv.writer(f, lineterminator=os.linesep)
+
+# Parquet release: low-cardinality text columns are dictionary-encoded, tags and
+# labels_json keep their list/struct shape instead of being JSON strings
+PARQUET_ROW_GROUP_SIZE = 100_000
+# Buffered Parquet rows are converted to Arrow in batches of this many
+PARQUET_BATCH_ROWS = 4096
+PARQUET_DICT_COLUMNS = {
+    "channel", "model", "dialect",
+    "category_level_1", "category_level_2", "category_level_3", "category_path",
+    "sentiment",
+}
+PARQUET_INT_COLUMNS = {"impact", "urgency", "priority"}
+
+def parquet_schema(columns: List[str] = CSV_COLUMNS) -> "pa.Schema":
+    tags = pa.list_(pa.string())
+    fields = []
+    for c in columns:
+        if c == "tags":
+            t = tags
+        elif c == "labels_json":
+            t = pa.struct([("l1", pa.string()), ("l2", pa.string()), ("l3", pa.string()), ("tags", tags)])
+        elif c in PARQUET_INT_COLUMNS:
+            t = pa.int8()
+        elif c in PARQUET_DICT_COLUMNS:
+            t = pa.dictionary(pa.int32(), pa.string())
+        else:
+            t = pa.string()
+        fields.append(pa.field(c, t))
+    return pa.schema(fields)
+
+def _text(v: Any) -> Optional[str]:
+    return v if v is None or isinstance(v, str) else dumps(v)
+
+def _text_list(v: Any) -> Optional[List[Optional[str]]]:
+    return [_text(t) for t in v] if isinstance(v, list) else None
+
+def parquet_record(obj: Dict[str, Any], columns: List[str] = CSV_COLUMNS) -> Dict[str, Any]:
+    """Coerce a clean ticket onto parquet_schema().
+
+    Validation pins the category, enum and score columns; free-text fields
+    and the labels_json members that are not strings are stored as JSON text.
+    """
+    rec = {c: _text(obj.get(c)) for c in columns}
+    for c in PARQUET_INT_COLUMNS:
+        rec[c] = int(obj[c])
+    rec["tags"] = _text_list(obj.get("tags"))
+    lj = obj.get("labels_json")
+    rec["labels_json"] = {"l1": _text(lj.get("l1")), "l2": _text(lj.get("l2")), "l3": _text(lj.get("l3")),
+                          "tags": _text_list(lj.get("tags"))}
+    return rec
+
+class ParquetSink:
+    """Writes clean tickets to Parquet, one category_level_1 per row group.
+
+    Rows are buffered per category_level_1, so the column statistics let
+    readers skip whole groups when filtering on category_level_1; rows keep
+    their build order within a category. Buffered rows are converted to
+    Arrow record batches every PARQUET_BATCH_ROWS rows, and all categories
+    share one budget of row_group_size rows: when it is reached, the largest
+    buffer is written as a row group (the rest at close). Memory stays at
+    about row_group_size rows in Arrow form however many categories there are.
+    """
+
+    def __init__(self, path: str, row_group_size: int = PARQUET_ROW_GROUP_SIZE, columns: List[str] = CSV_COLUMNS):
+        self.columns = columns
+        self.schema = parquet_schema(columns)
+        self.row_group_size = max(1, row_group_size)
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        # Per category_level_1: rows not converted yet, converted batches, and the row count of both
+        self.pending: Dict[Any, List[Dict[str, Any]]] = {}
+        self.batches: Dict[Any, List["pa.RecordBatch"]] = {}
+        self.counts: Counter = Counter()
+
+    def add(self, obj: Dict[str, Any]):
+        l1 = obj.get("category_level_1")
+        rows = self.pending.setdefault(l1, [])
+        rows.append(parquet_record(obj, self.columns))
+        self.counts[l1] += 1
+        if len(rows) >= PARQUET_BATCH_ROWS:
+            self._convert(l1)
+        if self.counts.total() >= self.row_group_size:
+            self.flush(self.counts.most_common(1)[0][0])
+
+    def _convert(self, l1: Any):
+        rows = self.pending.pop(l1, None)
+        if rows:
+            self.batches.setdefault(l1, []).append(pa.RecordBatch.from_pylist(rows, schema=self.schema))
+
+    def flush(self, l1: Any):
+        self._convert(l1)
+        batches = self.batches.pop(l1, None)
+        n = self.counts.pop(l1, 0)
+        if batches:
+            self.writer.write_table(pa.Table.from_batches(batches, schema=self.schema), row_group_size=n)
+
+    def close(self):
+        for l1 in sorted(self.counts, key=str):
+            self.flush(l1)
+        self.writer.close()
+
+def open_parquet(args) -> Optional[ParquetSink]:
+    if not args.out_parquet:
+        return None
+    return ParquetSink(args.out_parquet, args.parquet_row_group_size, output_columns(args.normalize_text))
+
+def write_streaming(rows: Iterator[Tuple[str, Any, RowMeta]], args, cache: Optional["BuildCache"] = None) -> Tuple[int, int]:
+    """Consume the validation pipeline, writing every output one row at a time."""
+    n_clean = 0
+    n_rejected = 0
+    rej_f = None
+    recorder = None
+    columns = output_columns(args.normalize_text)
+    parquet = open_parquet(args)
+
+    try:
+        with open(args.out_jsonl, "w", encoding="utf-8") as jf, \
+             open(args.out_csv, "w", encoding="utf-8-sig", newline="") as cf:
+            writer = csv_writer(cf)
+            writer.writerow(columns)
+
+            for kind, obj, meta in rows:
+                fp = meta[0]
+                if recorder is not None and recorder.source != fp:
+                    recorder.close()
+                    recorder = None
+                if recorder is None and cache is not None and kind != "cached" and cache.lookup(fp) is None:
+                    recorder = cache.recorder(fp)
+
+                if kind == "cached":
+                    n_clean += cache.splice(obj, "clean.jsonl", jf)
+                    if parquet is not None:
+                        for ticket in iter_jsonl(cache.fragment(obj, "clean.jsonl")):
+                            parquet.add(ticket)
+                    cache.splice(obj, "clean.csv", cf)
+                    if obj["rejected"]:
+                        if rej_f is None:
+                            rej_f = open(args.out_rejected, "w", encoding="utf-8")
+                        n_rejected += cache.splice(obj, "rejected.jsonl", rej_f)
+                elif kind == "clean":
+                    line = dumps_line(obj)
+                    row = csv_row(obj, columns)
+                    jf.write(line)
+                    writer.writerow(row)
+                    if parquet is not None:
+                        parquet.add(obj)
+                    n_clean += 1
+                    if recorder is not None:
+                        recorder.add_clean(obj, meta, line, row)
+                else:
+                    line = dumps_line(obj)
+                    if rej_f is None:
+                        rej_f = open(args.out_rejected, "w", encoding="utf-8")
+                    rej_f.write(line)
+                    n_rejected += 1
+                    if recorder is not None:
+                        recorder.add_rejected(obj, meta, line)
+    finally:
+        if parquet is not None:
+            parquet.close()
+        if recorder is not None:
+            recorder.close()
+        if rej_f is not None:
+            rej_f.close()
+
+    if not n_rejected and os.path.exists(args.out_rejected):
+        os.remove(args.out_rejected)
+
+    return n_clean, n_rejected
+
+# ---------- Build cache ----------
+# Bump when validation or output format changes so old manifests are ignored
+CACHE_VERSION = 3
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class BuildCache:
+    """Per-part validation results, keyed on part content and taxonomy hashes.
+
+    The manifest records, for every part, its sha256, the clean rows as
+    [line, offset, ticket_id], the rejects as [line, offset, ticket_id,
+    reason] and the REPAIR_RULES counts of the part. Each part's clean
+    JSONL/CSV lines and reject records are kept as fragment files next to
+    the manifest, so an unchanged part is spliced into the outputs with a
+    plain copy instead of being re-parsed.
+    """
+
+    def __init__(self, cache_dir: str, taxonomy_path: str, settings: str = ""):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self.taxonomy_sha256 = file_sha256(taxonomy_path)
+        # Build options that change validation results or columns (--resolve-categories, --normalize-text)
+        self.settings = settings
+        self.parts: Dict[str, Dict[str, Any]] = {}
+        self._hashes: Dict[str, str] = {}
+        # REPAIR_RULES counts of fresh parts, until their PartRecorder commits the entry
+        self._pending_repairs: Dict[str, Dict[str, int]] = {}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if (manifest.get("version") == CACHE_VERSION and manifest.get("taxonomy_sha256") == self.taxonomy_sha256
+                    and manifest.get("settings", "") == settings):
+                self.parts = manifest["parts"]
+
+    def part_sha256(self, fp: str) -> str:
+        if fp not in self._hashes:
+            st = os.stat(fp)
+            entry = self.parts.get(fp)
+            # Same size and mtime as last build: trust the recorded hash
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                self._hashes[fp] = entry["sha256"]
+            else:
+                self._hashes[fp] = file_sha256(fp)
+        return self._hashes[fp]
+
+    def forget(self, fp: str):
+        """Drop the memoized hash of a part that was rewritten during this run."""
+        self._hashes.pop(fp, None)
+
+    def lookup(self, fp: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for fp if the part is unchanged since it was recorded."""
+        entry = self.parts.get(fp)
+        if entry is None or entry["sha256"] != self.part_sha256(fp):
+            return None
+        if not all(os.path.exists(self.fragment(entry, name)) for name in ("clean.jsonl", "clean.csv", "rejected.jsonl")):
+            return None
+        return entry
+
+    def fragment(self, entry: Dict[str, Any], name: str) -> str:
+        return os.path.join(self.cache_dir, f"{entry['key']}.{name}")
+
+    def splice(self, entry: Dict[str, Any], name: str, out) -> int:
+        """Copy a fragment into an open output file; returns the number of rows copied."""
+        with open(self.fragment(entry, name), "r", encoding="utf-8", newline="") as f:
+            shutil.copyfileobj(f, out)
+        return len(entry["rejected"] if name.startswith("rejected") else entry["clean"])
+
+    @staticmethod
+    def clean_ids(entry: Dict[str, Any]) -> List[Any]:
+        return [r[2] for r in entry["clean"]]
+
+    @staticmethod
+    def row_ids(entry: Dict[str, Any]) -> List[Any]:
+        return [r[2] for r in entry["clean"]] + [r[2] for r in entry["rejected"] if r[2] is not None]
+
+    def part_key(self, fp: str) -> str:
+        return hashlib.sha256(f"{fp}\0{self.part_sha256(fp)}\0{self.taxonomy_sha256}".encode("utf-8")).hexdigest()[:20]
+
+    def dq_fragment(self, fp: str, sketch: bool, normalized: bool = False) -> str:
+        mode = ("-sketch" if sketch else "") + ("-norm" if normalized else "")
+        return os.path.join(self.cache_dir, f"{self.part_key(fp)}.dq{PARTIAL_VERSION}{mode}.pkl")
+
+    def dq_stats(self, fp: str, dq: DQStats) -> DQStats:
+        """The part's saved quality stats, scanning the part once if none were saved yet."""
+        path = self.dq_fragment(fp, dq.sketch, dq.normalized)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        stats = part_stats(fp, dq.taxonomy, dq.sketch, dq.normalized)
+        self.save_dq(fp, stats)
+        return stats
+
+    def save_dq(self, fp: str, stats: DQStats):
+        path = self.dq_fragment(fp, stats.sketch, stats.normalized)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(stats, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+    def repairs(self, fp: str) -> Counter:
+        """REPAIR_RULES counts recorded with the part's entry (see iter_validated)."""
+        entry = self.parts.get(fp)
+        return Counter(entry.get("repairs", {})) if entry else Counter()
+
+    def save_repairs(self, fp: str, counts: Counter):
+        """Hold a freshly validated part's counts; they are stored only if its entry is committed."""
+        self._pending_repairs[fp] = dict(counts)
+
+    def recorder(self, fp: str) -> "PartRecorder":
+        st = os.stat(fp)
+        sha = self.part_sha256(fp)
+        key = self.part_key(fp)
+        entry = {
+            "key": key, "sha256": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "clean": [], "rejected": [],
+        }
+        return PartRecorder(self, fp, entry)
+
+    def save(self):
+        """Write the manifest and drop fragments no part refers to any more."""
+        live = {entry["key"] for entry in self.parts.values()}
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "taxonomy_sha256": self.taxonomy_sha256, "settings": self.settings,
+                       "parts": self.parts}, f, ensure_ascii=False)
+        os.replace(tmp, self.manifest_path)
+        for name in os.listdir(self.cache_dir):
+            key = name.split(".", 1)[0]
+            if name != "manifest.json" and key not in live:
+                os.remove(os.path.join(self.cache_dir, name))
+
+class PartRecorder:
+    """Tee one freshly validated part into cache fragments while the build writes it."""
+
+    def __init__(self, cache: BuildCache, source: str, entry: Dict[str, Any]):
+        self.cache = cache
+        self.source = source
+        self.entry = entry
+        self.valid = True
+        self._clean_ids = set()
+        self._jf = open(cache.fragment(entry, "clean.jsonl"), "w", encoding="utf-8")
+        self._cf = open(cache.fragment(entry, "clean.csv"), "w", encoding="utf-8", newline="")
+        self._rf = open(cache.fragment(entry, "rejected.jsonl"), "w", encoding="utf-8")
+        self._writer = csv_writer(self._cf)
+
+    def add_clean(self, obj: Dict[str, Any], meta: RowMeta, line: str, row: List[Any]):
+        tid = obj.get("ticket_id")
+        self._clean_ids.add(tid)
+        self.entry["clean"].append([meta[1], meta[2], tid])
+        self._jf.write(line)
+        self._writer.writerow(row)
+
+    def add_rejected(self, rec: Dict[str, Any], meta: RowMeta, line: str):
+        tid = rec["ticket"].get("ticket_id") if "ticket" in rec else None
+        # Rejected as a duplicate of a row from an earlier part: this outcome
+        # depends on the other parts, so it must not be cached
+        if "bad:duplicate_ticket_id" in rec["reason"] and tid not in self._clean_ids:
+            self.valid = False
+        self.entry["rejected"].append([meta[1], meta[2], tid, rec["reason"]])
+        self._rf.write(line)
+
+    def close(self):
+        for f in (self._jf, self._cf, self._rf):
+            f.close()
+        repairs = self.cache._pending_repairs.pop(self.source, {})
+        if self.valid:
+            self.entry["repairs"] = repairs
+            self.cache.parts[self.source] = self.entry
+
 # ---------- Main ----------
 def main():
     args = parse_args()
 
+    settings = ",".join(([f"resolve={args.resolve_threshold}"] if args.resolve_categories else [])
+                        + (["normalize_text"] if args.normalize_text else []))
+    cache = BuildCache(args.cache_dir, args.taxonomy, settings) if args.cache_dir else None
     if args.apply_fixes:
-        apply_fixes(args.input_glob, args.out_rejected)
+        apply_fixes(args.input_glob, args.out_rejected, cache=cache)
+
+    if args.out_parquet and pa is None:
+        raise SystemExit("--out-parquet needs pyarrow (pip install pyarrow, or pass --out-parquet '' to skip it)")
 
-    allowed_paths, _ = load_taxonomy(args.taxonomy)
+    allowed_paths, triple_meta = load_taxonomy(args.taxonomy)
+    validator = RowValidator(triple_meta)
+    if args.resolve_categories:
+        validator.resolver = TaxonomyResolver.load(args.taxonomy, args.resolve_threshold)
+    validator.normalize_text = args.normalize_text
 
     # Read all partial jsonl files
     files = sorted(glob.glob(args.input_glob))
     if not files:
         raise SystemExit(f"No files matched: {args.input_glob}")
 
-    seen_ids = set()
-    cleaned: List[Dict[str, Any]] = []
-    rejected: List[Dict[str, Any]] = []
+    dq = DQStats(set(triple_meta), sketch=args.dq_sketch, normalized=args.normalize_text) if args.dq_report else None
+    repairs = Counter()
+    rows = iter_validated(files, validator, workers=args.workers, cache=cache, dq=dq,
+                          repairs=repairs)
 
-    for fp in files:
-        with open(fp, "r", encoding="utf-8") as f:
-            for line_no, line in enumerate(f, start=1):
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                except Exception:
-                    rejected.append({"source": fp, "line": line_no, "reason": ["bad:json_parse"], "raw": line})
-                    continue
+    if args.stream or cache is not None:
+        n_clean, n_rejected = write_streaming(rows, args, cache=cache)
+        if cache is not None:
+            # Forget parts that no longer match --input-glob
+            cache.parts = {fp: e for fp, e in cache.parts.items() if fp in set(files)}
+            cache.save()
+        rejected = iter_jsonl(args.out_rejected) if n_rejected else []
+    else:
+        cleaned: List[Dict[str, Any]] = []
+        rejected: List[Dict[str, Any]] = []
+        for kind, obj, _ in rows:
+            (cleaned if kind == "clean" else rejected).append(obj)
+        n_clean, n_rejected = len(cleaned), len(rejected)
 
-                errs = validate_row(obj, allowed_paths)
+        # Write clean JSONL
+        with open(args.out_jsonl, "w", encoding="utf-8") as f:
+            for obj in cleaned:
+                f.write(dumps_line(obj))
 
-                # Deduplicate ticket_id
-                tid = obj.get("ticket_id")
-                if tid in seen_ids:
-                    errs.append("bad:duplicate_ticket_id")
+        # Write CSV (flatten labels_json to string)
+        df = pd.DataFrame(cleaned)
+        df["labels_json"] = df["labels_json"].apply(dumps)
+        df["tags"] = df["tags"].apply(dumps)
+        df = df[[c for c in output_columns(args.normalize_text) if c in df.columns]]
 
-                # Auto-fix priority when it's the only error
-                if errs == ["bad:priority_rule"] and isinstance(obj.get("impact"), int) and isinstance(obj.get("urgency"), int):
-                    obj["priority"] = compute_priority(obj["impact"], obj["urgency"])
-                    errs = []
+        df.to_csv(args.out_csv, index=False, encoding="utf-8-sig")
 
-                if errs:
-                    rejected.append({"source": fp, "line": line_no, "reason": errs, "ticket": obj})
-                    continue
+        # Write Parquet (native list/struct columns)
+        parquet = open_parquet(args)
+        if parquet is not None:
+            for obj in cleaned:
+                parquet.add(obj)
+            parquet.close()
 
-                seen_ids.add(tid)
-
-                # Make tags stable (trim + lower for english tags)
-                obj["tags"] = [t.strip() for t in obj["tags"] if t and str(t).strip()]
-
-                cleaned.append(obj)
-
-    # Write clean JSONL
-    with open(args.out_jsonl, "w", encoding="utf-8") as f:
-        for obj in cleaned:
-            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-
-    # Write CSV (flatten labels_json to string)
-    df = pd.DataFrame(cleaned)
-    df["labels_json"] = df["labels_json"].apply(lambda x: json.dumps(x, ensure_ascii=False))
-    df["tags"] = df["tags"].apply(lambda x: json.dumps(x, ensure_ascii=False))
-
-    # Recommended column order
-    col_order = [
-        "ticket_id", "created_at", "updated_at", "channel", "model",
-        "dialect",
-        "title_ar", "description_ar",
-        "category_level_1", "category_level_2", "category_level_3", "category_path",
-        "tags", "labels_json",
-        "impact", "urgency", "priority", "sentiment"
-    ]
-    df = df[[c for c in col_order if c in df.columns]]
-
-    df.to_csv(args.out_csv, index=False, encoding="utf-8-sig")
-
-    # Write rejected JSONL (or clean up stale file)
-    if rejected:
-        with open(args.out_rejected, "w", encoding="utf-8") as f:
-            for obj in rejected:
-                f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-    elif os.path.exists(args.out_rejected):
-        os.remove(args.out_rejected)
+        # Write rejected JSONL (or clean up stale file)
+        if rejected:
+            with open(args.out_rejected, "w", encoding="utf-8") as f:
+                for obj in rejected:
+                    f.write(dumps_line(obj))
+        elif os.path.exists(args.out_rejected):
+            os.remove(args.out_rejected)
+
+    # Random-access index over the clean JSONL (see ticket_store.py)
+    index_path = default_index_path(args.out_jsonl) if args.out_index is None else args.out_index
+    if index_path:
+        build_index(args.out_jsonl, index_path)
+
+    if dq is not None:
+        os.makedirs(os.path.dirname(args.dq_report) or ".", exist_ok=True)
+        with open(args.dq_report, "w", encoding="utf-8") as f:
+            f.write(dq.report())
 
-    print(f"Clean rows: {len(cleaned)}")
-    print(f"Rejected rows: {len(rejected)}")
-    if rejected:
+    print(f"Clean rows: {n_clean}")
+    print(f"Rejected rows: {n_rejected}")
+    if repairs:
+        print("Auto-repaired (rule: rows): " + ", ".join(f"{name}: {n}" for name, n in repairs.most_common()))
+    if n_rejected:
         print(f"Rejected rows written to: {args.out_rejected}")
         print("\n--- Rejected rows (id, cause) ---")
         for r in rejected:
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
-import sys, json, random
+import argparse, random, hashlib
 from pathlib import Path
 
+from arabic_norm import text_key
+from jsonl_io import dumps_line, loads
+
 OS_CHOICES = ["Windows 10","Windows 11","macOS 14","Ubuntu 22.04"]
 EXTRA_SNIPPETS = [
     "المشكلة بتحصل مع أكتر من زميل في نفس الفريق.",
@@ -11,41 +14,54 @@ EXTRA_SNIPPETS = [
 ]
 
 
+def pair_digest(title, desc):
+    """16-byte key for a (title, description) pair; memory per distinct pair stays fixed."""
+    return hashlib.blake2b(title.encode('utf-8')+b'\0'+desc.encode('utf-8'), digest_size=16).digest()
+
+
+def dedupe_ticket(obj, seen, normalized=False):
+    """Append a unique tail to obj's description if its (title, description) pair is in seen; else add the pair.
+
+    With normalized, pairs are compared on arabic_norm.text_key(), so spelling
+    variants (hamza, taa marbuta, diacritics, punctuation) count as repeats.
+    """
+    if normalized:
+        key=pair_digest(text_key(obj.get('title_ar','')), text_key(obj.get('description_ar','')))
+    else:
+        key=pair_digest(obj.get('title_ar','').strip(), obj.get('description_ar','').strip())
+    if key in seen:
+        # add a unique tail sentence using ticket_id as seed
+        seed = sum(ord(c) for c in obj.get('ticket_id',''))
+        rr=random.Random(seed)
+        base_extra = rr.choice(EXTRA_SNIPPETS)
+        # deterministic per ticket id
+        hh = rr.randint(0,23); mm = rr.randint(0,59)
+        floor = 1 + (rr.randint(0,5))
+        os_pick = rr.choice(OS_CHOICES)
+        stamp = f"ملاحظة: ظهرت المشكلة حوالي الساعة {hh:02d}:{mm:02d} في مبنى A - الدور {floor} على {os_pick}."
+        d=obj.get('description_ar') or ''
+        if not d.endswith('.'): d=d+'.'
+        obj['description_ar']=d+" "+base_extra+" "+stamp
+    else:
+        seen.add(key)
+    return obj
+
+
 def main():
-    if len(sys.argv)<3:
-        print("Usage: dedupe_variants.py <IN.jsonl> <OUT.jsonl>", file=sys.stderr)
-        sys.exit(2)
-    inp=Path(sys.argv[1]); outp=Path(sys.argv[2])
-    counts={}
-    with inp.open('r', encoding='utf-8') as f:
-        for line in f:
-            if not line.strip(): continue
-            obj=json.loads(line)
-            key=(obj.get('title_ar','').strip(), obj.get('description_ar','').strip())
-            counts[key]=counts.get(key,0)+1
-    seen={}
-    rng=random.Random(42)
+    parser=argparse.ArgumentParser(description="Differentiate repeated (title, description) pairs.")
+    parser.add_argument("input", help="Input JSONL")
+    parser.add_argument("output", help="Output JSONL")
+    parser.add_argument("--normalized", action="store_true", help="Compare pairs on normalized Arabic text (arabic_norm.py)")
+    args=parser.parse_args()
+    inp=Path(args.input); outp=Path(args.output)
+    # Single pass: only repeats of a (title, description) pair are rewritten,
+    # so a pair is a duplicate as soon as its digest has been seen before.
+    seen=set()
     outp.parent.mkdir(parents=True, exist_ok=True)
     with inp.open('r', encoding='utf-8') as f, outp.open('w', encoding='utf-8') as fo:
         for line in f:
             if not line.strip(): continue
-            obj=json.loads(line)
-            key=(obj.get('title_ar','').strip(), obj.get('description_ar','').strip())
-            seen[key]=seen.get(key,0)+1
-            if counts.get(key,0)>1 and seen[key]>1:
-                # add a unique tail sentence using ticket_id as seed
-                seed = sum(ord(c) for c in obj.get('ticket_id',''))
-                rr=random.Random(seed)
-                base_extra = rr.choice(EXTRA_SNIPPETS)
-                # deterministic per ticket id
-                hh = rr.randint(0,23); mm = rr.randint(0,59)
-                floor = 1 + (rr.randint(0,5))
-                os_pick = rr.choice(OS_CHOICES)
-                stamp = f"ملاحظة: ظهرت المشكلة حوالي الساعة {hh:02d}:{mm:02d} في مبنى A - الدور {floor} على {os_pick}."
-                d=obj.get('description_ar') or ''
-                if not d.endswith('.'): d=d+'.'
-                obj['description_ar']=d+" "+base_extra+" "+stamp
-            fo.write(json.dumps(obj, ensure_ascii=False)+"\n")
+            fo.write(dumps_line(dedupe_ticket(loads(line), seen, args.normalized)))
 
 if __name__=='__main__':
     main()
@@ -1,7 +1,32 @@
 #!/usr/bin/env python3
-import sys, json, statistics, collections, re
+"""
+Data-quality report for ticket JSONL files.
+
+Usage: dq_report.py <JSONL_FILE_OR_GLOB> <TAXONOMY_JSON> [OUT.txt]
+                    [--sketch] [--normalized] [--workers N] [--partials DIR]
+
+Each matched file is scanned into its own DQStats partial (in a process
+pool with --workers), and the partials are merged in file order into one
+report. With --partials, each partial is also saved under a key made from
+the part's content hash, the taxonomy and the mode. A rerun then only
+scans parts that are new or changed, and only re-hashes parts whose size
+or mtime differ from the last run (recorded in hashes.json).
+
+--sketch estimates the duplicate stats with fixed-size sketches (see
+sketches.py) instead of keeping one key per distinct pair, for corpora too
+large to count exactly.
+
+--normalized measures lengths on arabic_norm.normalize_ar() text and
+counts two rows as duplicates when their normalized word tokens match, so
+pairs that differ only in diacritics, hamza/yaa/taa marbuta spelling,
+tatweel or punctuation are caught.
+"""
+import sys, json, hashlib, argparse, glob, os, pickle
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from dq_stats import DQStats, PARTIAL_VERSION, part_stats
+
 def load_taxonomy(path: Path):
     t = json.loads(path.read_text(encoding='utf-8'))
     allowed = set()
@@ -11,164 +36,119 @@ def load_taxonomy(path: Path):
             allowed.add((l1,l2,l3))
     return allowed
 
-REQ_KEYS = [
-    "ticket_id","created_at","updated_at","channel","model","dialect",
-    "title_ar","description_ar","category_level_1","category_level_2",
-    "category_level_3","category_path","tags","labels_json","impact",
-    "urgency","priority","sentiment"
-]
-
-CHANNELS = {"email","portal","chatbot","phone"}
-SENTIMENTS = {"positive","neutral","negative","mixed"}
-
 
-def priority_rule(impact:int, urgency:int)->int:
-    pr = int((impact+urgency)/2 + 0.5)
-    return 1 if pr<1 else 5 if pr>5 else pr
+# Part path -> size, mtime_ns and sha256 when it was last hashed, kept in the partials dir
+HASH_INDEX = "hashes.json"
+
+
+def file_sha256(path):
+    h=hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_hashes(partials_dir):
+    path=os.path.join(partials_dir, HASH_INDEX)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_hashes(partials_dir, hashes):
+    path=os.path.join(partials_dir, HASH_INDEX)
+    tmp=path+".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def part_sha256(path, hashes):
+    """Content hash of a part; the recorded one is trusted while size and mtime are unchanged."""
+    st=os.stat(path)
+    key=os.path.abspath(path)
+    entry=hashes.get(key)
+    if entry and entry["size"]==st.st_size and entry["mtime_ns"]==st.st_mtime_ns:
+        return entry["sha256"]
+    sha=file_sha256(path)
+    hashes[key]={"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+    return sha
+
+
+def partial_path(partials_dir, part_sha, taxonomy_sha, sketch, normalized=False):
+    key=hashlib.sha256(f"{PARTIAL_VERSION}\0{part_sha}\0{taxonomy_sha}\0{int(sketch)}\0{int(normalized)}".encode('utf-8')).hexdigest()[:24]
+    return os.path.join(partials_dir, key+".pkl")
+
+
+def save_partial(path, stats):
+    tmp=path+".tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(stats, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def collect_stats(files, taxonomy, taxonomy_sha, sketch=False, workers=1, partials_dir=None, normalized=False):
+    """Merge per-part DQStats for files (in order), reusing and saving partials when partials_dir is set."""
+    partials=[None]*len(files)
+    cached_at=[None]*len(files)
+    if partials_dir:
+        os.makedirs(partials_dir, exist_ok=True)
+        hashes=load_hashes(partials_dir)
+        for i, fp in enumerate(files):
+            cached_at[i]=partial_path(partials_dir, part_sha256(fp, hashes), taxonomy_sha, sketch, normalized)
+            if os.path.exists(cached_at[i]):
+                with open(cached_at[i], 'rb') as f:
+                    partials[i]=pickle.load(f)
+
+    todo=[i for i, p in enumerate(partials) if p is None]
+    if workers>1 and len(todo)>1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futures={i: ex.submit(part_stats, files[i], taxonomy, sketch, normalized) for i in todo}
+            for i in todo:
+                partials[i]=futures[i].result()
+    else:
+        for i in todo:
+            partials[i]=part_stats(files[i], taxonomy, sketch, normalized)
+    if partials_dir:
+        for i in todo:
+            save_partial(cached_at[i], partials[i])
+        save_hashes(partials_dir, hashes)
+
+    stats=DQStats(taxonomy, sketch=sketch, normalized=normalized)
+    for p in partials:
+        stats.merge(p)
+    return stats, len(todo)
+
+
+def parse_args():
+    parser=argparse.ArgumentParser(description="Data-quality report for ticket JSONL files.")
+    parser.add_argument("input", help="JSONL file or glob (e.g. 'parts/part_*.jsonl')")
+    parser.add_argument("taxonomy", help="Taxonomy JSON")
+    parser.add_argument("out", nargs="?", default=None, help="Write the report here instead of stdout")
+    parser.add_argument("--sketch", action="store_true", help="Estimate duplicate stats in fixed memory")
+    parser.add_argument("--normalized", action="store_true", help="Length and duplicate stats on normalized Arabic text (arabic_norm.py)")
+    parser.add_argument("--workers", type=int, default=1, help="Scan parts in this many processes (default: 1)")
+    parser.add_argument("--partials", default=None, help="Directory for saved per-part partials")
+    return parser.parse_args()
 
 
 def main():
-    if len(sys.argv)<3:
-        print("Usage: dq_report.py <JSONL_FILE> <TAXONOMY_JSON> [OUT.txt]", file=sys.stderr)
+    args=parse_args()
+    files=sorted(glob.glob(args.input))
+    if not files:
+        print(f"No files matched: {args.input}", file=sys.stderr)
         sys.exit(2)
-    infile = Path(sys.argv[1])
-    taxonomy = load_taxonomy(Path(sys.argv[2]))
-    outpath = Path(sys.argv[3]) if len(sys.argv)>3 else None
-
-    total=0
-    missing_keys=0
-    bad_channel=0
-    bad_sentiment=0
-    bad_priority=0
-    bad_catpath=0
-    bad_taxonomy=0
-
-    l1_counter=collections.Counter()
-    l2_counter=collections.Counter()
-    l3_counter=collections.Counter()
-    ch_counter=collections.Counter()
-    sent_counter=collections.Counter()
-    impact_counter=collections.Counter()
-    urgency_counter=collections.Counter()
-    priority_counter=collections.Counter()
-
-    title_desc_hashes=collections.Counter()
-    desc_lengths=[]
-    title_lengths=[]
-
-    first_10_bad_priority=[]
-    first_10_bad_tax=[]
-
-    with infile.open('r', encoding='utf-8') as f:
-        for line in f:
-            line=line.strip()
-            if not line:
-                continue
-            total+=1
-            try:
-                obj=json.loads(line)
-            except Exception:
-                continue
-            # keys
-            if any(k not in obj for k in REQ_KEYS):
-                missing_keys+=1
-            # channel/sentiment
-            if obj.get("channel") not in CHANNELS:
-                bad_channel+=1
-            if obj.get("sentiment") not in SENTIMENTS:
-                bad_sentiment+=1
-            # priority
-            imp=obj.get("impact",0); urg=obj.get("urgency",0)
-            pr_calc=priority_rule(int(imp), int(urg))
-            if obj.get("priority")!=pr_calc:
-                bad_priority+=1
-                if len(first_10_bad_priority)<10:
-                    first_10_bad_priority.append((obj.get("ticket_id"), imp, urg, obj.get("priority"), pr_calc))
-            # taxonomy
-            l1=obj.get("category_level_1"); l2=obj.get("category_level_2"); l3=obj.get("category_level_3")
-            if (l1,l2,l3) not in taxonomy:
-                bad_taxonomy+=1
-                if len(first_10_bad_tax)<10:
-                    first_10_bad_tax.append((obj.get("ticket_id"), l1,l2,l3))
-            # category_path
-            cp_expected=f"{l1} > {l2} > {l3}"
-            if obj.get("category_path")!=cp_expected:
-                bad_catpath+=1
-            # counters
-            l1_counter[l1]+=1; l2_counter[(l1,l2)]+=1; l3_counter[(l1,l2,l3)]+=1
-            ch_counter[obj.get("channel")]+=1
-            sent_counter[obj.get("sentiment")]+=1
-            impact_counter[int(imp)]+=1
-            urgency_counter[int(urg)]+=1
-            priority_counter[int(obj.get("priority",0))]+=1
-            # lengths
-            t=obj.get("title_ar") or ""; d=obj.get("description_ar") or ""
-            title_lengths.append(len(t))
-            # rough word count not used yet; store char lengths
-            desc_lengths.append(len(d))
-            # dup hash
-            key=(t.strip(), d.strip())
-            title_desc_hashes[key]+=1
-
-    # duplicate stats (exact title+description pairs)
-    dup_pairs=sum(1 for k,c in title_desc_hashes.items() if c>1)
-    dup_records=sum(c-1 for c in title_desc_hashes.values() if c>1)
-
-    def pct(x):
-        return 0 if total==0 else (100.0*x/total)
-
-    lines=[]
-    lines.append(f"Total: {total}")
-    lines.append("== Violations ==")
-    lines.append(f"Missing required keys: {missing_keys} ({pct(missing_keys):.2f}%)")
-    lines.append(f"Bad channel: {bad_channel} ({pct(bad_channel):.2f}%)")
-    lines.append(f"Bad sentiment: {bad_sentiment} ({pct(bad_sentiment):.2f}%)")
-    lines.append(f"Priority rule mismatches: {bad_priority} ({pct(bad_priority):.2f}%)")
-    lines.append(f"Taxonomy (L1/L2/L3) not allowed: {bad_taxonomy} ({pct(bad_taxonomy):.2f}%)")
-    lines.append(f"category_path mismatch: {bad_catpath} ({pct(bad_catpath):.2f}%)")
-    lines.append("")
-    lines.append("First 10 priority mismatches (ticket, impact, urgency, priority, expected):")
-    for r in first_10_bad_priority:
-        lines.append(str(r))
-    lines.append("First 10 taxonomy violations (ticket, L1,L2,L3):")
-    for r in first_10_bad_tax:
-        lines.append(str(r))
-    lines.append("")
-
-    lines.append("== Lengths (chars) ==")
-    if desc_lengths:
-        lines.append(f"Description len: mean {statistics.mean(desc_lengths):.1f}, median {statistics.median(desc_lengths):.1f}, min {min(desc_lengths)}, max {max(desc_lengths)}")
-    if title_lengths:
-        lines.append(f"Title len: mean {statistics.mean(title_lengths):.1f}, median {statistics.median(title_lengths):.1f}, min {min(title_lengths)}, max {max(title_lengths)}")
-    lines.append("")
-
-    def topn(counter, n=10, fmt=lambda k: str(k)):
-        return [f"{fmt(k)}: {v}" for k,v in counter.most_common(n)]
-
-    lines.append("== Distributions ==")
-    lines.append("Top L1:")
-    lines += topn(l1_counter)
-    lines.append("Top L2 (by L1,L2):")
-    lines += topn(l2_counter, fmt=lambda k: " > ".join(k))
-    lines.append("Top L3 (by L1,L2,L3):")
-    lines += topn(l3_counter, fmt=lambda k: " > ".join(k))
-    lines.append("Channels:")
-    lines += topn(ch_counter)
-    lines.append("Sentiment:")
-    lines += topn(sent_counter)
-    lines.append("Impact:")
-    lines += topn(impact_counter)
-    lines.append("Urgency:")
-    lines += topn(urgency_counter)
-    lines.append("Priority:")
-    lines += topn(priority_counter)
-    lines.append("")
-
-    lines.append("== Duplicates ==")
-    lines.append(f"Duplicate (exact title+description) pairs: {dup_pairs}")
-    lines.append(f"Duplicate extra records (beyond first): {dup_records}")
-
-    report="\n".join(lines)+"\n"
+    taxonomy = load_taxonomy(Path(args.taxonomy))
+    outpath = Path(args.out) if args.out else None
+
+    stats, scanned=collect_stats(files, taxonomy, file_sha256(args.taxonomy), sketch=args.sketch,
+                                 workers=args.workers, partials_dir=args.partials, normalized=args.normalized)
+    if args.partials:
+        print(f"Scanned {scanned} of {len(files)} parts (rest from {args.partials})", file=sys.stderr)
+
+    report=stats.report()
     if outpath:
         outpath.parent.mkdir(parents=True, exist_ok=True)
         outpath.write_text(report, encoding='utf-8')
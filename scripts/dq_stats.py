@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+DQStats, the streaming accumulator behind dq_report.py.
+
+It lives in its own module so that pickled partials (dq_report.py
+--partials, build_dataset.py --cache-dir) and results coming back from
+worker processes always refer to dq_stats.DQStats, whichever script is
+running as __main__.
+"""
+import collections, hashlib
+
+from arabic_norm import normalize_ar, text_key
+from sketches import HyperLogLog, DistinctSampler
+from jsonl_io import loads
+
+REQ_KEYS = [
+    "ticket_id","created_at","updated_at","channel","model","dialect",
+    "title_ar","description_ar","category_level_1","category_level_2",
+    "category_level_3","category_path","tags","labels_json","impact",
+    "urgency","priority","sentiment"
+]
+
+CHANNELS = {"email","portal","chatbot","phone"}
+SENTIMENTS = {"positive","neutral","negative","mixed"}
+
+
+def priority_rule(impact:int, urgency:int)->int:
+    # Same rule as build_dataset.compute_priority: round half up, clamp to 1..5
+    pr = (impact+urgency+1)//2
+    return 1 if pr<1 else 5 if pr>5 else pr
+
+
+def as_int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def pair_key(title, desc):
+    """Fixed-size key for an exact (title, description) pair."""
+    return hashlib.blake2b(title.encode('utf-8')+b'\0'+desc.encode('utf-8'), digest_size=16).digest()
+
+
+def length_summary(hist):
+    """(mean, median, min, max) of a length -> count histogram, same values statistics.* gives on the raw list."""
+    n=sum(hist.values())
+    values=sorted(hist)
+    mean=sum(v*c for v,c in hist.items())/n
+    # median: middle value, or the average of the two middle values
+    wanted=[(n-1)//2, n//2]
+    found=[]
+    seen=0
+    for v in values:
+        seen+=hist[v]
+        while wanted and wanted[0]<seen:
+            found.append(v); wanted.pop(0)
+        if not wanted:
+            break
+    median=found[0] if n%2 else (found[0]+found[1])/2
+    return mean, median, values[0], values[-1]
+
+
+class DQStats:
+    """Streaming data-quality accumulator.
+
+    Memory is bounded except for the duplicate check: lengths are kept as
+    length -> count histograms, so mean/median/min/max stay exact. In the
+    default exact mode, duplicates are counted over a 16-byte digest per
+    distinct (title, description) pair. With sketch=True they are estimated
+    from a HyperLogLog plus a hash-sampled pair counter, both fixed size.
+    With normalized=True, lengths and duplicate keys use normalized text.
+    """
+
+    def __init__(self, taxonomy, sketch=False, normalized=False):
+        self.taxonomy=taxonomy
+        self.sketch=sketch
+        self.normalized=normalized
+
+        self.total=0
+        self.missing_keys=0
+        self.bad_channel=0
+        self.bad_sentiment=0
+        self.bad_priority=0
+        self.bad_catpath=0
+        self.bad_taxonomy=0
+
+        self.l1_counter=collections.Counter()
+        self.l2_counter=collections.Counter()
+        self.l3_counter=collections.Counter()
+        self.ch_counter=collections.Counter()
+        self.sent_counter=collections.Counter()
+        self.impact_counter=collections.Counter()
+        self.urgency_counter=collections.Counter()
+        self.priority_counter=collections.Counter()
+
+        self.desc_lengths=collections.Counter()
+        self.title_lengths=collections.Counter()
+        if sketch:
+            self.pairs_hll=HyperLogLog()
+            self.pairs_sample=DistinctSampler()
+        else:
+            self.title_desc_hashes=collections.Counter()
+
+        self.first_10_bad_priority=[]
+        self.first_10_bad_tax=[]
+
+    def add_line(self, line):
+        line=line.strip()
+        if not line:
+            return
+        self.total+=1
+        try:
+            obj=loads(line)
+        except Exception:
+            return
+        self.add_parsed(obj)
+
+    def add(self, obj):
+        """Count one ticket that did not come from add_line."""
+        self.total+=1
+        self.add_parsed(obj)
+
+    def add_unparsed(self):
+        """Count a non-blank line that is not valid JSON."""
+        self.total+=1
+
+    def add_parsed(self, obj):
+        # keys
+        if any(k not in obj for k in REQ_KEYS):
+            self.missing_keys+=1
+        # channel/sentiment
+        if obj.get("channel") not in CHANNELS:
+            self.bad_channel+=1
+        if obj.get("sentiment") not in SENTIMENTS:
+            self.bad_sentiment+=1
+        # priority
+        imp=obj.get("impact",0); urg=obj.get("urgency",0)
+        imp_i=as_int(imp); urg_i=as_int(urg)
+        pr_calc=priority_rule(imp_i, urg_i) if imp_i is not None and urg_i is not None else None
+        if obj.get("priority")!=pr_calc:
+            self.bad_priority+=1
+            if len(self.first_10_bad_priority)<10:
+                self.first_10_bad_priority.append((obj.get("ticket_id"), imp, urg, obj.get("priority"), pr_calc))
+        # taxonomy
+        l1=obj.get("category_level_1"); l2=obj.get("category_level_2"); l3=obj.get("category_level_3")
+        if (l1,l2,l3) not in self.taxonomy:
+            self.bad_taxonomy+=1
+            if len(self.first_10_bad_tax)<10:
+                self.first_10_bad_tax.append((obj.get("ticket_id"), l1,l2,l3))
+        # category_path
+        cp_expected=f"{l1} > {l2} > {l3}"
+        if obj.get("category_path")!=cp_expected:
+            self.bad_catpath+=1
+        # counters
+        self.l1_counter[l1]+=1; self.l2_counter[(l1,l2)]+=1; self.l3_counter[(l1,l2,l3)]+=1
+        self.ch_counter[obj.get("channel")]+=1
+        self.sent_counter[obj.get("sentiment")]+=1
+        self.impact_counter[imp_i]+=1
+        self.urgency_counter[urg_i]+=1
+        self.priority_counter[as_int(obj.get("priority",0))]+=1
+        # lengths (chars)
+        t=obj.get("title_ar") or ""; d=obj.get("description_ar") or ""
+        if self.normalized:
+            t=normalize_ar(t); d=normalize_ar(d)
+        self.title_lengths[len(t)]+=1
+        self.desc_lengths[len(d)]+=1
+        # dup hash
+        key=pair_key(text_key(t), text_key(d)) if self.normalized else pair_key(t.strip(), d.strip())
+        if self.sketch:
+            h=int.from_bytes(key[:8], 'little')
+            self.pairs_hll.add_hash(h)
+            self.pairs_sample.add_hash(h)
+        else:
+            self.title_desc_hashes[key]+=1
+
+    COUNT_FIELDS = ("total","missing_keys","bad_channel","bad_sentiment","bad_priority","bad_catpath","bad_taxonomy")
+    COUNTER_FIELDS = ("l1_counter","l2_counter","l3_counter","ch_counter","sent_counter",
+                      "impact_counter","urgency_counter","priority_counter","desc_lengths","title_lengths")
+
+    def merge(self, other):
+        """Fold the stats of a later part into self (associative, order-preserving)."""
+        if other.sketch!=self.sketch:
+            raise ValueError("cannot merge exact and sketch stats")
+        if other.normalized!=self.normalized:
+            raise ValueError("cannot merge raw and normalized text stats")
+        for name in self.COUNT_FIELDS:
+            setattr(self, name, getattr(self, name)+getattr(other, name))
+        for name in self.COUNTER_FIELDS:
+            getattr(self, name).update(getattr(other, name))
+        self.first_10_bad_priority=(self.first_10_bad_priority+other.first_10_bad_priority)[:10]
+        self.first_10_bad_tax=(self.first_10_bad_tax+other.first_10_bad_tax)[:10]
+        if self.sketch:
+            self.pairs_hll.merge(other.pairs_hll)
+            self.pairs_sample.merge(other.pairs_sample)
+        else:
+            self.title_desc_hashes.update(other.title_desc_hashes)
+        return self
+
+    def report(self):
+        total=self.total
+
+        # duplicate stats (exact title+description pairs)
+        if self.sketch:
+            dup_pairs=round(self.pairs_sample.repeated_keys())
+            dup_records=round(self.pairs_sample.extra_occurrences())
+        else:
+            dup_pairs=sum(1 for k,c in self.title_desc_hashes.items() if c>1)
+            dup_records=sum(c-1 for c in self.title_desc_hashes.values() if c>1)
+
+        def pct(x):
+            return 0 if total==0 else (100.0*x/total)
+
+        lines=[]
+        lines.append(f"Total: {total}")
+        lines.append("== Violations ==")
+        lines.append(f"Missing required keys: {self.missing_keys} ({pct(self.missing_keys):.2f}%)")
+        lines.append(f"Bad channel: {self.bad_channel} ({pct(self.bad_channel):.2f}%)")
+        lines.append(f"Bad sentiment: {self.bad_sentiment} ({pct(self.bad_sentiment):.2f}%)")
+        lines.append(f"Priority rule mismatches: {self.bad_priority} ({pct(self.bad_priority):.2f}%)")
+        lines.append(f"Taxonomy (L1/L2/L3) not allowed: {self.bad_taxonomy} ({pct(self.bad_taxonomy):.2f}%)")
+        lines.append(f"category_path mismatch: {self.bad_catpath} ({pct(self.bad_catpath):.2f}%)")
+        lines.append("")
+        lines.append("First 10 priority mismatches (ticket, impact, urgency, priority, expected):")
+        for r in self.first_10_bad_priority:
+            lines.append(str(r))
+        lines.append("First 10 taxonomy violations (ticket, L1,L2,L3):")
+        for r in self.first_10_bad_tax:
+            lines.append(str(r))
+        lines.append("")
+
+        text_mode=", normalized text" if self.normalized else ""
+        lines.append(f"== Lengths (chars{text_mode}) ==")
+        if self.desc_lengths:
+            mean, median, lo, hi = length_summary(self.desc_lengths)
+            lines.append(f"Description len: mean {mean:.1f}, median {median:.1f}, min {lo}, max {hi}")
+        if self.title_lengths:
+            mean, median, lo, hi = length_summary(self.title_lengths)
+            lines.append(f"Title len: mean {mean:.1f}, median {median:.1f}, min {lo}, max {hi}")
+        lines.append("")
+
+        def topn(counter, n=10, fmt=lambda k: str(k)):
+            return [f"{fmt(k)}: {v}" for k,v in counter.most_common(n)]
+
+        lines.append("== Distributions ==")
+        lines.append("Top L1:")
+        lines += topn(self.l1_counter)
+        lines.append("Top L2 (by L1,L2):")
+        lines += topn(self.l2_counter, fmt=lambda k: " > ".join(k))
+        lines.append("Top L3 (by L1,L2,L3):")
+        lines += topn(self.l3_counter, fmt=lambda k: " > ".join(k))
+        lines.append("Channels:")
+        lines += topn(self.ch_counter)
+        lines.append("Sentiment:")
+        lines += topn(self.sent_counter)
+        lines.append("Impact:")
+        lines += topn(self.impact_counter)
+        lines.append("Urgency:")
+        lines += topn(self.urgency_counter)
+        lines.append("Priority:")
+        lines += topn(self.priority_counter)
+        lines.append("")
+
+        lines.append("== Duplicates (normalized text) ==" if self.normalized else "== Duplicates ==")
+        if self.sketch:
+            lines.append(f"Distinct title+description pairs (HyperLogLog estimate): ~{len(self.pairs_hll)}")
+            lines.append(f"Duplicate (exact title+description) pairs (sampled estimate, 1/{self.pairs_sample.scale}): ~{dup_pairs}")
+            lines.append(f"Duplicate extra records (beyond first) (sampled estimate, 1/{self.pairs_sample.scale}): ~{dup_records}")
+        else:
+            lines.append(f"Duplicate (exact title+description) pairs: {dup_pairs}")
+            lines.append(f"Duplicate extra records (beyond first): {dup_records}")
+
+        return "\n".join(lines)+"\n"
+
+
+# Bump when DQStats' fields or rules change, so saved partials are not reused
+PARTIAL_VERSION = 4
+
+
+def part_stats(path, taxonomy, sketch, normalized=False):
+    stats=DQStats(taxonomy, sketch=sketch, normalized=normalized)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            stats.add_line(line)
+    return stats
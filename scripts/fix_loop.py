@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Closed-loop repair of build_dataset.py rejects.
+
+Replaces the manual reject -> fixer prompt -> *_fixed.jsonl -> rebuild cycle
+for the rows in dataset_rejected.jsonl. Each round:
+
+1. build_dataset's REPAIR_RULES repair what is mechanical (score types,
+   channel/sentiment case, swapped timestamps, category_path vs. the level
+   fields, labels_json, priority), as far as they go for each row;
+2. the rows it cannot repair are grouped by error code and sent in batches
+   through a fixer backend (llm_driver.py's mock or OpenAI-compatible
+   backends; --backend rules uses only step 1). A batch carries its code
+   once, and the allowed category paths only for category errors;
+3. only the returned rows are re-validated (RowValidator + check_row, with
+   ticket_ids checked against the clean dataset through its ticket_store
+   index and against rows already fixed).
+
+Rows that still fail go into the next round with their new error codes,
+until every row is fixed, a round fixes nothing, or --max-rounds is hit.
+
+Fixed rows are appended to <part>_fixed.jsonl next to their source part,
+ready for `build_dataset.py --apply-fixes --cache-dir ...`, which then only
+revalidates the parts that changed. Rows left over are written to
+--out-remaining. Rejects that are not JSON and duplicate ticket_ids are not
+attempted: --apply-fixes swaps fixes in by ticket_id, which would replace
+the clean row holding the same id.
+
+Usage:
+    fix_loop.py [--rejected dataset_rejected.jsonl] [--clean dataset_clean.jsonl] [--backend rules|mock|openai]
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter, defaultdict
+from contextlib import aclosing
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from build_dataset import RowValidator, apply_repairs, check_row, load_taxonomy
+from jsonl_io import dumps_line, iter_jsonl, loads
+from llm_driver import (PROMPTS_DIR, BackendError, MockBackend, OpenAIBackend, Request, TokenBucket,
+                        backoff_delay, iter_lines)
+from ticket_store import TicketStore
+
+# Groups whose fixer batches need the allowed category paths
+CATEGORY_CODES = {"bad:category_not_allowed", "bad:category_path_mismatch"}
+# Never attempted, see the module docstring
+SKIP_CODES = {"bad:json_parse", "bad:duplicate_ticket_id"}
+
+
+def group_key(reasons: List[str]) -> str:
+    """The error code a reject is batched under: its first code, with missing:* fields pooled."""
+    code = reasons[0] if reasons else "unknown"
+    return "missing" if code.startswith("missing:") else code
+
+
+class SeenIds:
+    """ticket_ids taken: the clean dataset's (via its index) plus the ones fixed in this run."""
+
+    def __init__(self, store: Optional[TicketStore]):
+        self.store = store
+        self.fixed = set()
+
+    def __contains__(self, ticket_id: object) -> bool:
+        return ticket_id in self.fixed or (self.store is not None and ticket_id in self.store)
+
+    def add(self, ticket_id: str):
+        self.fixed.add(ticket_id)
+
+
+# ---------- Loop ----------
+class FixLoop:
+    def __init__(self, validator: RowValidator, seen: SeenIds, backend=None, batch_size: int = 20,
+                 concurrency: int = 4, bucket: Optional[TokenBucket] = None, retries: int = 5,
+                 backoff: float = 1.0, prompts_dir: Path = PROMPTS_DIR):
+        self.validator = validator
+        self.seen = seen
+        self.backend = backend
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.bucket = bucket or TokenBucket(0)
+        self.retries = retries
+        self.backoff = backoff
+        self.fixer_prompt = (prompts_dir / "fixer_v1.md").read_text(encoding="utf-8")
+        self.allowed_paths = sorted(validator.allowed_paths)
+        # (source, ticket) for every fixed row, in the order they were fixed
+        self.fixed: List[Tuple[str, Dict[str, Any]]] = []
+        # First error code of each reject, so stats stay per original group
+        self.origin: Dict[Tuple[str, int], str] = {}
+        # group -> Counter of rows / rules / fixer / left
+        self.stats: Dict[str, Counter] = defaultdict(Counter)
+
+    def group(self, rec: Dict[str, Any]) -> str:
+        return self.origin.get((rec["source"], rec["line"])) or group_key(rec["reason"])
+
+    def check(self, rec: Dict[str, Any], ticket: Dict[str, Any], how: str) -> Optional[Dict[str, Any]]:
+        """Re-validate one repaired row; None if it is fixed, else the updated reject record."""
+        kind, out = check_row(ticket, self.validator(ticket), self.seen, rec["source"], rec["line"], self.validator)
+        if kind == "clean":
+            self.fixed.append((rec["source"], out))
+            self.stats[self.group(rec)][how] += 1
+            return None
+        return out
+
+    def request(self, code: str, records: List[Dict[str, Any]]) -> Request:
+        user = ("INPUT_FILE = the lines after INPUT\nOUTPUT_FILE = this reply\n"
+                f"Every row below failed with {code}.\n")
+        if code in CATEGORY_CODES:
+            user += "TAXONOMY_FILE = the allowed category paths below\n\nAllowed category paths:\n" + "\n".join(self.allowed_paths) + "\n"
+        user += "\nINPUT\n" + "".join(dumps_line({"reason": r["reason"], "ticket": r["ticket"]}) for r in records)
+        return Request("fix", [{"role": "system", "content": self.fixer_prompt},
+                               {"role": "user", "content": user}],
+                       len(records), records=records)
+
+    async def call(self, code: str, records: List[Dict[str, Any]], sem: asyncio.Semaphore) -> List[Optional[Dict[str, Any]]]:
+        """Fixer output for each record (None where it gave nothing usable), retrying the unanswered tail."""
+        out: List[Optional[Dict[str, Any]]] = []
+        attempt = 0
+        async with sem:
+            while len(out) < len(records):
+                await self.bucket.acquire()
+                try:
+                    todo = records[len(out):]
+                    async with aclosing(iter_lines(self.backend.stream(self.request(code, todo)))) as lines:
+                        async for line in lines:
+                            try:
+                                obj = loads(line)
+                            except Exception:
+                                obj = None
+                            # Unwrap {"ticket": ...} if the fixer echoed the wrapper
+                            if isinstance(obj, dict) and isinstance(obj.get("ticket"), dict):
+                                obj = obj["ticket"]
+                            out.append(obj if isinstance(obj, dict) else None)
+                            if len(out) == len(records):
+                                break
+                    if len(out) < len(records):
+                        raise BackendError("short response")
+                except BackendError as e:
+                    if not e.retryable:
+                        raise
+                    attempt += 1
+                    if attempt > self.retries:
+                        break
+                    await asyncio.sleep(e.retry_after if e.retry_after is not None
+                                        else backoff_delay(attempt, self.backoff, 60.0))
+        return out + [None] * (len(records) - len(out))
+
+    async def fixer_pass(self, pending: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for rec in pending:
+            groups[group_key(rec["reason"])].append(rec)
+        batches = [(code, recs[i:i + self.batch_size]) for code, recs in groups.items()
+                   for i in range(0, len(recs), self.batch_size)]
+        sem = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self.call(code, recs, sem) for code, recs in batches))
+
+        left = []
+        for (code, recs), answers in zip(batches, results):
+            for rec, ticket in zip(recs, answers):
+                if ticket is None:
+                    left.append(rec)
+                    continue
+                out = self.check(rec, ticket, "fixer")
+                if out is not None:
+                    left.append(out)
+        return left
+
+    def run(self, pending: List[Dict[str, Any]], max_rounds: int = 5) -> Tuple[List[Dict[str, Any]], int]:
+        """Rows still failing after the loop converges, and the number of rounds run."""
+        for rec in pending:
+            self.origin[(rec["source"], rec["line"])] = group_key(rec["reason"])
+            self.stats[group_key(rec["reason"])]["rows"] += 1
+        rounds = 0
+        while pending and rounds < max_rounds:
+            rounds += 1
+            before = len(pending)
+            left = []
+            for rec in pending:
+                # Partial repairs too: whatever the rules can do is off the fixer's plate
+                ticket, _ = apply_repairs(rec["ticket"], rec["reason"], self.validator)
+                out = self.check(rec, ticket, "rules")
+                if out is not None:
+                    left.append(out)
+            if left and self.backend is not None:
+                left = asyncio.run(self.fixer_pass(left))
+            pending = left
+            if len(pending) == before:
+                break
+        return pending, rounds
+
+
+def fixed_path(source: str) -> str:
+    # parts/part_001.jsonl -> parts/part_001_fixed.jsonl, as --apply-fixes expects
+    return source.rsplit(".jsonl", 1)[0] + "_fixed.jsonl"
+
+
+# ---------- CLI ----------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Repair rejected rows in rounds until they validate, writing *_fixed.jsonl files.")
+    parser.add_argument("--rejected", default="dataset_rejected.jsonl", help="Rejects from build_dataset.py (default: dataset_rejected.jsonl)")
+    parser.add_argument("--clean", default="dataset_clean.jsonl", help="Clean JSONL whose ticket_ids fixed rows must not reuse (default: dataset_clean.jsonl)")
+    parser.add_argument("--taxonomy", default="taxonomy_itsm_v1.json", help="Taxonomy JSON (default: taxonomy_itsm_v1.json)")
+    parser.add_argument("--out-remaining", default="dataset_rejected_remaining.jsonl", help="Rows still invalid at the end (default: dataset_rejected_remaining.jsonl)")
+    parser.add_argument("--max-rounds", type=int, default=5, help="Repair rounds at most (default: 5)")
+    parser.add_argument("--backend", choices=("rules", "mock", "openai"), default="rules", help="Fixer for rows the local rules cannot repair (default: rules only)")
+    parser.add_argument("--batch-size", type=int, default=20, help="Rows per fixer request (default: 20)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Fixer requests in flight (default: 4)")
+    parser.add_argument("--rps", type=float, default=1.0, help="Fixer requests started per second; 0 for no limit (default: 1)")
+    parser.add_argument("--retries", type=int, default=5, help="Retries per fixer request (default: 5)")
+    parser.add_argument("--prompts-dir", default=str(PROMPTS_DIR), help="Directory with fixer_v1.md")
+    parser.add_argument("--base-url", default="https://api.openai.com/v1", help="openai: API base URL")
+    parser.add_argument("--model", default=None, help="openai: model name")
+    parser.add_argument("--api-key-env", default="OPENAI_API_KEY", help="openai: environment variable holding the API key")
+    args = parser.parse_args()
+    if args.backend == "openai" and not args.model:
+        parser.error("--backend openai needs --model")
+    return args
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.rejected):
+        raise SystemExit(f"No rejects to fix: {args.rejected} not found")
+    _, triple_meta = load_taxonomy(args.taxonomy)
+
+    backend = None
+    if args.backend == "mock":
+        from generate_tickets_local import load_taxonomy as load_combos
+        backend = MockBackend(load_combos(Path(args.taxonomy)), latency=0.05, row_delay=0.0)
+    elif args.backend == "openai":
+        backend = OpenAIBackend(args.base_url, args.model, os.environ.get(args.api_key_env), max_workers=args.concurrency)
+
+    store = TicketStore(args.clean) if os.path.exists(args.clean) else None
+    loop = FixLoop(RowValidator(triple_meta), SeenIds(store), backend, args.batch_size, args.concurrency,
+                   TokenBucket(args.rps, args.concurrency), args.retries, prompts_dir=Path(args.prompts_dir))
+
+    pending, skipped = [], []
+    for rec in iter_jsonl(args.rejected):
+        if "ticket" not in rec or SKIP_CODES & set(rec.get("reason", [])) or not os.path.exists(rec.get("source", "")):
+            skipped.append(rec)
+        else:
+            pending.append(rec)
+
+    t0 = time.perf_counter()
+    try:
+        left, rounds = loop.run(pending, args.max_rounds)
+    except BackendError as e:
+        raise SystemExit(f"Backend error: {e}")
+    elapsed = time.perf_counter() - t0
+    if store is not None:
+        store.close()
+
+    by_source: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for source, ticket in loop.fixed:
+        by_source[source].append(ticket)
+    for source, tickets in by_source.items():
+        with open(fixed_path(source), "a", encoding="utf-8") as f:
+            for ticket in tickets:
+                f.write(dumps_line(ticket))
+        print(f"Wrote {len(tickets)} fixed rows to {fixed_path(source)}")
+
+    remaining = skipped + left
+    if remaining:
+        with open(args.out_remaining, "w", encoding="utf-8") as f:
+            for rec in remaining:
+                f.write(dumps_line(rec))
+    elif os.path.exists(args.out_remaining):
+        os.remove(args.out_remaining)
+
+    print(f"\nRounds: {rounds} ({elapsed:.1f}s)")
+    print(f"{'error code':<36} {'rows':>6} {'rules':>6} {'fixer':>6} {'left':>6}")
+    left_by = Counter(loop.group(r) for r in left)
+    for code, c in sorted(loop.stats.items()):
+        print(f"{code:<36} {c['rows']:>6} {c['rules']:>6} {c['fixer']:>6} {left_by[code]:>6}")
+    print(f"Fixed: {len(loop.fixed)}  Not attempted: {len(skipped)}  Still failing: {len(left)}")
+    if remaining:
+        print(f"Remaining rejects written to: {args.out_remaining}")
+    if loop.fixed:
+        print("Merge with: python build_dataset.py --apply-fixes --cache-dir .build_cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
-import json, random, sys
+import argparse, hashlib, json, random
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain, repeat
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+import numpy as np
+
+from jsonl_io import dumps, dumps_line
+from sampling_plan import SamplingPlan
+
 TAGS_FALLBACK = ["bug","error","request","network","wifi","vpn","outlook","dns","mfa","sso","printer","laptop","policy","security"]
 
 TITLE_TEMPLATES = {
@@ -72,6 +80,9 @@ DESC_TEMPLATES = {
 
 SENTIMENTS = ["positive","neutral","negative","mixed"]
 CHANNELS = ["email","portal","chatbot","phone"]
+SCORES = [1,2,3,4,5]
+# Values a SamplingPlan can weight, besides the taxonomy leaves
+PLAN_VALUES = {"channel": CHANNELS, "sentiment": SENTIMENTS, "impact": SCORES, "urgency": SCORES}
 
 def load_taxonomy(path: Path):
     data = json.loads(Path(path).read_text(encoding='utf-8'))
@@ -82,14 +93,14 @@ def load_taxonomy(path: Path):
             combos.append((l1,l2,l3,tags))
     return combos
 
-def rand_ts():
-    day = random.randint(1, 20)
-    hour = random.randint(0, 23)
-    minute = random.randint(0, 59)
+def rand_ts(rng: random.Random):
+    day = rng.randint(1, 20)
+    hour = rng.randint(0, 23)
+    minute = rng.randint(0, 59)
     tz = timezone(timedelta(hours=2))
     created = datetime(2026, 2, day, hour, minute, 0, tzinfo=tz)
-    add_hours = random.randint(0, 72)
-    add_minutes = random.randint(0, 59)
+    add_hours = rng.randint(0, 72)
+    add_minutes = rng.randint(0, 59)
     updated = created + timedelta(hours=add_hours, minutes=add_minutes)
     return created.isoformat(timespec='seconds'), updated.isoformat(timespec='seconds')
 
@@ -98,56 +109,271 @@ def round_priority(i, u):
     pr = int(val + 0.5)
     return max(1, min(5, pr))
 
-def pick_title_desc(l1,l2,l3):
+def pick_title_desc(rng: random.Random, l1,l2,l3):
     key = (l1,l2,l3)
     titles = TITLE_TEMPLATES.get(key) or [f"مشكلة في {l3}", f"طلب متعلق بـ {l2}"]
     descs = DESC_TEMPLATES.get(key) or [
         f"فيه مشكلة مرتبطة بـ {l1} / {l2} / {l3}. الموضوع مأثر على الشغل ومحتاج يتحل بسرعة.",
         f"المشكلة مستمرة من يومين. جربت Restart وبرضه نفس الوضع. لو محتاجين لوجز أنا جاهز."
     ]
-    return random.choice(titles), random.choice(descs)
+    return rng.choice(titles), rng.choice(descs)
+
+def shard_seed(seed: int, index: str) -> int:
+    # Independent, stable stream per shard: the same (seed, index) always
+    # gives the same shard, whichever worker or run produces it
+    return int.from_bytes(hashlib.blake2b(f"{seed}:{index}".encode('utf-8'), digest_size=8).digest(), 'little')
+
+def make_ticket(rng: random.Random, ticket_id: str, combos, model_name: str = "gemini-3-flash",
+                dialect: str = "Egyptian", draw=None) -> dict:
+    """One template ticket; planned fields come from draw's Samplers, the rest are uniform."""
+    draw = draw or {}
+    cat, imp, urg, chan, sent = (draw.get(k) for k in ("category", "impact", "urgency", "channel", "sentiment"))
+    l1,l2,l3,tags_pool = combos[cat.next(rng)] if cat else rng.choice(combos)
+    created_at, updated_at = rand_ts(rng)
+    impact = SCORES[imp.next(rng)] if imp else rng.randint(1,5)
+    urgency = SCORES[urg.next(rng)] if urg else rng.randint(1,5)
+    priority = round_priority(impact, urgency)
+    tags_sel = rng.sample(tags_pool if len(tags_pool)>=2 else TAGS_FALLBACK, k=min(len(tags_pool), rng.randint(2,6)) if len(tags_pool)>=2 else 2)
+    title, desc = pick_title_desc(rng, l1,l2,l3)
+    return {
+        "ticket_id": ticket_id,
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "channel": CHANNELS[chan.next(rng)] if chan else rng.choice(CHANNELS),
+        "model": model_name,
+        "dialect": dialect,
+        "title_ar": title,
+        "description_ar": desc,
+        "category_level_1": l1,
+        "category_level_2": l2,
+        "category_level_3": l3,
+        "category_path": f"{l1} > {l2} > {l3}",
+        "tags": tags_sel,
+        "labels_json": {"l1": l1, "l2": l2, "l3": l3, "tags": tags_sel},
+        "impact": impact,
+        "urgency": urgency,
+        "priority": priority,
+        "sentiment": SENTIMENTS[sent.next(rng)] if sent else rng.choice(SENTIMENTS),
+    }
 
-def gen(index: str, count: int, outfile: Path, model_name: str = "gemini-3-flash", dialect: str = "Egyptian"):
-    combos = load_taxonomy(Path("taxonomy.json"))
-    rng = random.Random()
+def gen(index: str, count: int, outfile: Path, model_name: str = "gemini-3-flash", dialect: str = "Egyptian",
+        taxonomy: Path = Path("taxonomy_itsm_v1.json"), seed=None, combos=None, plan=None, exact=False):
+    combos = combos or load_taxonomy(taxonomy)
+    rng = random.Random(seed)
+    # Planned fields come from their Sampler; the rest keep the uniform draws
+    draw = plan.samplers(combos, PLAN_VALUES, count, exact) if plan else {}
     with outfile.open('w', encoding='utf-8') as f:
         for seq in range(1, count+1):
-            l1,l2,l3,tags_pool = rng.choice(combos)
-            created_at, updated_at = rand_ts()
-            impact = rng.randint(1,5)
-            urgency = rng.randint(1,5)
-            priority = round_priority(impact, urgency)
-            tags_sel = rng.sample(tags_pool if len(tags_pool)>=2 else TAGS_FALLBACK, k=min(len(tags_pool), rng.randint(2,6)) if len(tags_pool)>=2 else 2)
-            title, desc = pick_title_desc(l1,l2,l3)
-            ticket = {
-                "ticket_id": f"TCKT-{index}-{seq:03d}",
-                "created_at": created_at,
-                "updated_at": updated_at,
-                "channel": rng.choice(CHANNELS),
-                "model": model_name,
-                "dialect": dialect,
-                "title_ar": title,
-                "description_ar": desc,
-                "category_level_1": l1,
-                "category_level_2": l2,
-                "category_level_3": l3,
-                "category_path": f"{l1} > {l2} > {l3}",
-                "tags": tags_sel,
-                "labels_json": {"l1": l1, "l2": l2, "l3": l3, "tags": tags_sel},
-                "impact": impact,
-                "urgency": urgency,
-                "priority": priority,
-                "sentiment": rng.choice(SENTIMENTS),
-            }
-            f.write(json.dumps(ticket, ensure_ascii=False) + "\n")
+            f.write(dumps_line(make_ticket(rng, f"TCKT-{index}-{seq:03d}", combos, model_name, dialect, draw)))
+
+# ---------- Fast engine ----------
+# Rows drawn per vectorized batch / written per block
+FAST_BLOCK = 50_000
+MAX_TAGS = 6
+# Timestamps are drawn as minute offsets from this local (+02:00) midnight
+FAST_EPOCH = np.datetime64("2026-02-01T00:00", "m")
+
+def _table(strings):
+    return np.array([x.encode('utf-8') for x in strings], dtype=object)
+
+class FastTables:
+    """UTF-8 JSON fragments of everything gen_fast draws from, built once per shard.
+
+    A ticket line is then eight table lookups joined together:
+    id, created_at, updated_at, [channel..category_path], tags, [labels_json], tags, [impact..sentiment].
+    """
+
+    def __init__(self, combos, model_name: str, dialect: str):
+        n = len(combos)
+        pools = [tags_pool if len(tags_pool) >= 2 else TAGS_FALLBACK for _, _, _, tags_pool in combos]
+        self.n_combos = n
+        self.pool_size = np.array([len(p) for p in pools])
+        # A pool under 2 tags draws exactly 2 fallback tags, otherwise min(pool, randint(2,6))
+        self.fixed_k = np.array([len(tags_pool) < 2 for _, _, _, tags_pool in combos])
+        self.tags = np.full((n, int(self.pool_size.max())), b"", dtype=object)
+        for c, pool in enumerate(pools):
+            self.tags[c, :len(pool)] = [dumps(t).encode('utf-8') for t in pool]
+        self.tags_sep = b", " + self.tags
+
+        # Every minute rand_ts can produce: created within days 1-20, updated up to 72:59 later
+        stamps = np.datetime_as_string(FAST_EPOCH + np.arange(20 * 1440 + 73 * 60), unit="s").tolist()
+        self.created = _table([f'{ts}+02:00", "updated_at": "' for ts in stamps])
+        self.updated = _table([f'{ts}+02:00", "channel": ' for ts in stamps])
+
+        # (combo, title/description pair, channel) -> everything from the channel
+        # value up to '"tags": '; pairs are drawn uniformly, like two independent choices
+        body = []
+        self.body_off = np.zeros(n, dtype=np.int64)
+        self.n_pairs = np.zeros(n, dtype=np.int64)
+        head = [f'{dumps(ch)}, "model": {dumps(model_name)}, "dialect": {dumps(dialect)}, "title_ar": ' for ch in CHANNELS]
+        for c, (l1, l2, l3, _) in enumerate(combos):
+            key = (l1, l2, l3)
+            ts = TITLE_TEMPLATES.get(key) or [f"مشكلة في {l3}", f"طلب متعلق بـ {l2}"]
+            ds = DESC_TEMPLATES.get(key) or [
+                f"فيه مشكلة مرتبطة بـ {l1} / {l2} / {l3}. الموضوع مأثر على الشغل ومحتاج يتحل بسرعة.",
+                f"المشكلة مستمرة من يومين. جربت Restart وبرضه نفس الوضع. لو محتاجين لوجز أنا جاهز."
+            ]
+            category = dumps({"category_level_1": l1, "category_level_2": l2, "category_level_3": l3,
+                              "category_path": f"{l1} > {l2} > {l3}"})[1:-1]
+            self.body_off[c], self.n_pairs[c] = len(body), len(ts) * len(ds)
+            body.extend(f'{h}{dumps(t)}, "description_ar": {dumps(d)}, {category}, "tags": '
+                        for t in ts for d in ds for h in head)
+        self.body = _table(body)
+        self.labels = _table([
+            ', "labels_json": ' + dumps({"l1": l1, "l2": l2, "l3": l3})[:-1] + ', "tags": '
+            for l1, l2, l3, _ in combos
+        ])
+        # (impact, urgency, sentiment) -> '}, "impact": ..., "sentiment": ...}\n'
+        self.scores = _table([
+            f'}}, "impact": {i}, "urgency": {u}, "priority": {round_priority(i, u)}, "sentiment": {dumps(se)}}}\n'
+            for i in range(1, 6) for u in range(1, 6) for se in SENTIMENTS
+        ])
+
+@lru_cache(maxsize=4)
+def _cached_tables(combos, model_name: str, dialect: str) -> FastTables:
+    return FastTables(combos, model_name, dialect)
+
+def fast_tables(combos, model_name: str, dialect: str) -> FastTables:
+    """FastTables for these arguments, built once per process and reused by every shard it generates."""
+    key = tuple((l1, l2, l3, tuple(pool)) for l1, l2, l3, pool in combos)
+    return _cached_tables(key, model_name, dialect)
+
+def fast_lines(index: str, start: int, n: int, t: FastTables, rng: np.random.Generator, draw=None) -> bytes:
+    """UTF-8 JSONL of tickets start..start+n-1, laid out exactly as dumps_line(ticket).
+
+    draw maps planned fields to their SamplingPlan Sampler; others are uniform.
+    """
+    draw = draw or {}
+
+    def pick(field, k):
+        return draw[field].take(rng, n) if field in draw else rng.integers(0, k, n)
+
+    combo = pick("category", t.n_combos)
+
+    # Tag samples: a random permutation prefix of each row's pool
+    size = t.pool_size[combo]
+    k = np.where(t.fixed_k[combo], 2, np.minimum(size, rng.integers(2, MAX_TAGS + 1, n)))
+    picks = np.zeros((n, MAX_TAGS), dtype=np.int64)
+    for m in np.unique(size).tolist():
+        rows = np.flatnonzero(size == m)
+        perm = np.argsort(rng.random((len(rows), m)), axis=1)[:, :MAX_TAGS]
+        picks[rows, :perm.shape[1]] = perm
+    tag_cols = [t.tags[combo, picks[:, 0]].tolist()]
+    for j in range(1, MAX_TAGS):
+        tag_cols.append(np.where(k > j, t.tags_sep[combo, picks[:, j]], b"").tolist())
+    tags = list(map(b"".join, zip(repeat(b"["), *tag_cols, repeat(b"]"))))
+
+    created = rng.integers(0, 20, n) * 1440 + rng.integers(0, 24, n) * 60 + rng.integers(0, 60, n)
+    updated = created + rng.integers(0, 73, n) * 60 + rng.integers(0, 60, n)
+    pair = (rng.random(n) * t.n_pairs[combo]).astype(np.int64)
+    body = t.body[t.body_off[combo] + pair * len(CHANNELS) + pick("channel", len(CHANNELS))]
+    impact = pick("impact", len(SCORES))
+    urgency = pick("urgency", len(SCORES))
+    sentiment = pick("sentiment", len(SENTIMENTS))
+    scores = t.scores[(impact * 5 + urgency) * len(SENTIMENTS) + sentiment]
+
+    # One join over the interleaved columns; no per-row concatenation
+    prefix = ('{"ticket_id": ' + dumps(f"TCKT-{index}-")[:-1]).encode('utf-8')
+    columns = (
+        [b'%s%03d", "created_at": "' % (prefix, seq) for seq in range(start, start + n)],
+        t.created[created].tolist(), t.updated[updated].tolist(), body.tolist(),
+        tags, t.labels[combo].tolist(), tags, scores.tolist(),
+    )
+    return b"".join(chain.from_iterable(zip(*columns)))
+
+def gen_fast(index: str, count: int, outfile: Path, model_name: str = "gemini-3-flash", dialect: str = "Egyptian",
+             taxonomy: Path = Path("taxonomy_itsm_v1.json"), seed=None, combos=None, plan=None, exact=False):
+    """gen() with the same field distributions and JSON layout, drawn with NumPy in blocks.
+
+    The random streams differ from gen(), so a seed gives different (but
+    equally reproducible) tickets under each engine.
+    """
+    combos = combos or load_taxonomy(taxonomy)
+    tables = fast_tables(combos, model_name, dialect)
+    rng = np.random.default_rng(seed)
+    draw = plan.samplers(combos, PLAN_VALUES, count, exact) if plan else {}
+    with outfile.open('wb') as f:
+        for start in range(1, count + 1, FAST_BLOCK):
+            f.write(fast_lines(index, start, min(FAST_BLOCK, count + 1 - start), tables, rng, draw))
+
+ENGINES = {"python": gen, "numpy": gen_fast}
+
+def gen_shard(job):
+    engine, index, count, outfile, seed, kwargs = job
+    ENGINES[engine](index, count, outfile, seed=shard_seed(seed, index), **kwargs)
+    return str(outfile)
+
+def gen_shards(shards: int, count: int, out_dir: Path, seed: int, workers: int = 1, first: int = 1,
+               model_name: str = "gemini-3-flash", dialect: str = "Egyptian", taxonomy: Path = Path("taxonomy_itsm_v1.json"),
+               engine: str = "python", plan=None, exact=False):
+    """Write shards first..first+shards-1 to out_dir/part_NNN.jsonl with ids TCKT-NNN-<seq>.
+
+    With exact=True each shard hits the plan's counts for its own size.
+    """
+    kwargs = dict(model_name=model_name, dialect=dialect, combos=load_taxonomy(taxonomy), plan=plan, exact=exact)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs = []
+    for shard in range(first, first + shards):
+        index = f"{shard:03d}"
+        jobs.append((engine, index, count, out_dir / f"part_{index}.jsonl", seed, kwargs))
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(gen_shard, jobs))
+    return [gen_shard(job) for job in jobs]
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Generate template-based Arabic ITSM tickets.",
+        usage="%(prog)s INDEX OUTFILE [COUNT=500] [MODEL=gemini-3-flash] [--seed S]\n"
+              "       %(prog)s --shards N [--count C] [--workers M] [--seed S] [--out-dir parts]",
+    )
+    parser.add_argument("index", nargs="?", help="Ticket id index: ids are TCKT-<INDEX>-<seq>")
+    parser.add_argument("outfile", nargs="?", help="Output JSONL path")
+    parser.add_argument("count", nargs="?", type=int, default=500, help="Tickets to generate (per shard with --shards)")
+    parser.add_argument("model", nargs="?", default="gemini-3-flash", help="Value of the model field")
+    parser.add_argument("--taxonomy", default="taxonomy_itsm_v1.json", help="Taxonomy JSON (default: taxonomy_itsm_v1.json)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible output (default: random)")
+    parser.add_argument("--shards", type=int, default=0, help="Generate N independently seeded shards instead of one file")
+    parser.add_argument("--count", dest="shard_count", type=int, default=None, help="Tickets per shard (default: COUNT)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes writing shards concurrently; output does not depend on it")
+    parser.add_argument("--out-dir", default="parts", help="Shard output directory (default: parts)")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="python",
+                        help="numpy: vectorized engine for large corpora (same distributions, different stream per seed)")
+    parser.add_argument("--plan", default=None, help="Sampling plan JSON with target weights (see sampling_plan.py)")
+    parser.add_argument("--plan-from", default=None, help="Use the distribution observed in this clean JSONL as the plan")
+    parser.add_argument("--balance", action="store_true", help="With --plan-from: split the new rows so that dataset's classes even out")
+    parser.add_argument("--exact", action="store_true", help="Hit the plan's counts exactly per shard instead of sampling them")
+    parser.add_argument("--first-shard", type=int, default=1, help="Number of the first shard (default: 1)")
+    args = parser.parse_args()
+    if not args.shards and (args.index is None or args.outfile is None):
+        parser.error("INDEX and OUTFILE are required unless --shards is given")
+    if args.plan and args.plan_from:
+        parser.error("--plan and --plan-from are mutually exclusive")
+    if args.balance and not args.plan_from:
+        parser.error("--balance needs --plan-from")
+    return args
+
+def load_plan(args, total: int):
+    try:
+        if args.plan:
+            return SamplingPlan.load(args.plan)
+        if args.plan_from:
+            return SamplingPlan.observed(args.plan_from, balance_total=total if args.balance else None)
+    except ValueError as e:
+        raise SystemExit(f"Bad sampling plan: {e}")
+    return None
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: generate_tickets_local.py <INDEX> <OUTFILE> [COUNT=500] [MODEL=gemini-3-flash]", file=sys.stderr)
-        sys.exit(2)
-    index = sys.argv[1]
-    outfile = Path(sys.argv[2])
-    count = int(sys.argv[3]) if len(sys.argv) > 3 else 500
-    model_name = sys.argv[4] if len(sys.argv) > 4 else "gemini-3-flash"
-    outfile.parent.mkdir(parents=True, exist_ok=True)
-    gen(index, count, outfile, model_name=model_name)
+    args = parse_args()
+    count = args.shard_count if args.shard_count is not None else args.count
+    plan = load_plan(args, count * max(args.shards, 1))
+    if args.shards:
+        seed = args.seed if args.seed is not None else random.SystemRandom().randrange(1 << 32)
+        paths = gen_shards(args.shards, count, Path(args.out_dir), seed, workers=args.workers, first=args.first_shard,
+                           model_name=args.model, taxonomy=Path(args.taxonomy), engine=args.engine, plan=plan, exact=args.exact)
+        print(f"Wrote {len(paths)} shards x {count} tickets to {args.out_dir} (seed {seed})")
+    else:
+        outfile = Path(args.outfile)
+        outfile.parent.mkdir(parents=True, exist_ok=True)
+        ENGINES[args.engine](args.index, count, outfile, model_name=args.model, taxonomy=Path(args.taxonomy), seed=args.seed,
+                             plan=plan, exact=args.exact)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Shared JSON / JSONL helpers for the pipeline scripts.
+
+Decoding goes through the first available backend of msgspec, orjson and
+the stdlib. Set JSONL_BACKEND=stdlib|orjson|msgspec to pick one. Any
+line the fast backend refuses (NaN, integers beyond 64 bits, lone surrogate
+escapes, ...) is retried with json.loads, so what parses and what it parses
+to is the same as with the stdlib alone.
+
+Encoding always uses the stdlib encoder with ensure_ascii=False. The
+released files use its ", " / ": " separators, and orjson and msgspec only
+write compact JSON, so a fast encoder would change every output byte. A
+single pre-built JSONEncoder skips the per-call setup json.dumps(...,
+ensure_ascii=False) pays, and its output is byte-identical. Objects with a
+to_dict() method (ticket.Ticket records) encode as that dict.
+"""
+import json
+import os
+from typing import Any, Callable, Dict, Iterator, Union
+
+
+def _to_dict(obj: Any) -> Any:
+    # Record types (ticket.Ticket, ...) encode as their plain-dict form
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
+
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, default=_to_dict)
+
+
+def _stdlib_loads(s: Union[str, bytes]) -> Any:
+    return json.loads(s)
+
+
+def _has_float(o: Any) -> bool:
+    values = o.values() if type(o) is dict else o
+    types = set(map(type, values))
+    if float in types:
+        return True
+    if dict in types or list in types:
+        return any(_has_float(v) for v in values if type(v) is dict or type(v) is list)
+    return False
+
+
+def _backends() -> Dict[str, Callable[[Union[str, bytes]], Any]]:
+    found = {}
+    try:
+        import msgspec
+        found["msgspec"] = msgspec.json.decode
+    except ImportError:
+        pass
+    try:
+        import orjson
+
+        def orjson_loads(s: Union[str, bytes]) -> Any:
+            obj = orjson.loads(s)
+            # orjson turns integers outside the 64-bit range into floats
+            # instead of failing; tickets have no floats, so recheck any that do
+            if (type(obj) is dict or type(obj) is list) and _has_float(obj) or type(obj) is float:
+                raise ValueError("float in orjson result")
+            return obj
+
+        found["orjson"] = orjson_loads
+    except ImportError:
+        pass
+    found["stdlib"] = _stdlib_loads
+    return found
+
+
+BACKENDS = _backends()
+
+
+def _pick_backend() -> str:
+    wanted = os.environ.get("JSONL_BACKEND")
+    if wanted:
+        if wanted not in BACKENDS:
+            raise SystemExit(f"JSONL_BACKEND={wanted} is not available (have: {', '.join(BACKENDS)})")
+        return wanted
+    return next(iter(BACKENDS))
+
+
+BACKEND = _pick_backend()
+
+
+def make_loads(backend: str) -> Callable[[Union[str, bytes]], Any]:
+    """A loads() for backend that falls back to json.loads on anything the backend rejects."""
+    fast = BACKENDS[backend]
+    if fast is _stdlib_loads:
+        return json.loads
+
+    def loads(s: Union[str, bytes]) -> Any:
+        try:
+            return fast(s)
+        except Exception:
+            return json.loads(s)
+
+    return loads
+
+
+loads = make_loads(BACKEND)
+
+
+def dumps(obj: Any) -> str:
+    """json.dumps(obj, ensure_ascii=False), byte for byte."""
+    return _ENCODER.encode(obj)
+
+
+def dumps_line(obj: Any) -> str:
+    return _ENCODER.encode(obj) + "\n"
+
+
+def iter_jsonl(path: str) -> Iterator[Any]:
+    """Parsed objects of a JSONL file, skipping blank lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Asynchronous LLM generation driver.
+
+Fans out prompts/generation_v1.md requests (N tickets each) and
+prompts/fixer_v1.md requests (batches of rejected rows) to a backend:
+
+- at most --concurrency requests in flight, started no faster than the
+  --rps token bucket allows (--burst at once);
+- failed or short responses are retried for the rows still missing, after
+  an exponential backoff with jitter (or the server's Retry-After);
+- every response is streamed and each line is validated as it arrives,
+  with the same checks as build_dataset.py (RowValidator + check_row,
+  duplicate ticket_ids across the whole run included). Valid rows go
+  straight into out_dir/part_NNN.jsonl; rejects join the fix queue, which
+  is served before new generation requests, so a backlog of fixes holds
+  generation back instead of growing without bound;
+- rows still invalid after --max-fix-rounds fixer passes, and lines that
+  are not JSON objects, go to --out-rejected in build_dataset's format.
+
+Backends: "openai" talks to any OpenAI-compatible /chat/completions
+endpoint (stdlib urllib, streamed); "mock" runs offline, streaming
+generate_tickets_local.py template tickets with configurable latency,
+error rate, corrupt rows, server-side rate limit and capacity, to exercise
+throughput, retries and backpressure without an API key.
+
+Usage:
+    llm_driver.py --count 2000 --backend mock --mock-bad-rate 0.1 --mock-error-rate 0.05
+    llm_driver.py --count 1000 --backend openai --base-url http://localhost:8000/v1 --model my-model
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import re
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from build_dataset import (ALLOWED_CHANNELS, ALLOWED_SENTIMENT, RowValidator, check_row, compute_priority,
+                           load_taxonomy)
+from generate_tickets_local import load_taxonomy as load_combos, make_ticket
+from jsonl_io import dumps_line, loads
+
+PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+# HTTP statuses worth retrying: rate limited, overloaded, transient server errors
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class BackendError(Exception):
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class Request:
+    """One backend call: chat messages plus the structured job the mock backend reads instead."""
+
+    def __init__(self, kind: str, messages: List[Dict[str, str]], n: int, id_prefix: str = "",
+                 first_seq: int = 1, records: Optional[List[Dict[str, Any]]] = None):
+        self.kind = kind
+        self.messages = messages
+        self.n = n
+        self.id_prefix = id_prefix
+        self.first_seq = first_seq
+        self.records = records or []
+
+
+class Job:
+    """A generation request for n rows, or a fixer request for a batch of (record, round) pairs."""
+
+    def __init__(self, kind: str, n: int, id_prefix: str = "", fixes: Optional[List[Tuple[Dict[str, Any], int]]] = None):
+        self.kind = kind
+        self.n = n
+        self.id_prefix = id_prefix
+        self.next_seq = 1
+        self.fixes = deque(fixes or [])
+        self.attempt = 0
+
+
+# ---------- Rate limiting ----------
+class TokenBucket:
+    """Allows rate acquisitions per second on average, up to burst back to back; rate 0 disables it."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.stamp: Optional[float] = None
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self.stamp is not None:
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with equal jitter: half fixed, half random."""
+    d = min(cap, base * 2 ** (attempt - 1))
+    return d / 2 + random.uniform(0, d / 2)
+
+
+# ---------- Backends ----------
+def _retry_after(headers) -> Optional[float]:
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class OpenAIBackend:
+    """Streams chat completions from an OpenAI-compatible endpoint; blocking urllib calls run in threads."""
+
+    def __init__(self, base_url: str, model: str, api_key: Optional[str] = None, timeout: float = 300.0,
+                 temperature: float = 0.8, max_workers: int = 8):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.temperature = temperature
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _post(self, messages: List[Dict[str, str]], on_text):
+        body = json.dumps({"model": self.model, "messages": messages, "temperature": self.temperature,
+                           "stream": True}).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        req = urllib.request.Request(self.url, data=body, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                # Server-sent events: "data: {chunk}" lines, ended by "data: [DONE]"
+                for raw in resp:
+                    line = raw.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = loads(data).get("choices") or [{}]
+                    text = (choices[0].get("delta") or {}).get("content")
+                    if text:
+                        on_text(text)
+        except urllib.error.HTTPError as e:
+            raise BackendError(f"HTTP {e.code} from {self.url}", retryable=e.code in RETRY_STATUS,
+                               retry_after=_retry_after(e.headers)) from e
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise BackendError(f"{self.url}: {e}") from e
+
+    async def stream(self, request: Request) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        fut = loop.run_in_executor(self.executor, self._post, request.messages,
+                                   lambda text: loop.call_soon_threadsafe(queue.put_nowait, text))
+        # Scheduled after every chunk the thread queued before returning
+        fut.add_done_callback(lambda _: queue.put_nowait(None))
+        while True:
+            text = await queue.get()
+            if text is None:
+                break
+            yield text
+        await fut
+
+
+class MockBackend:
+    """Offline backend serving template tickets line by line.
+
+    Generation requests get make_ticket() rows with the requested ids, a
+    bad_rate share of them broken (category_path, channel case, swapped
+    timestamps, truncated JSON). Fixer requests get each ticket back with the
+    mechanical errors repaired. error_rate is the share of requests that fail
+    before or part-way through the stream; rps and capacity make the mock
+    answer 429 / 503 when it is called too fast or too concurrently.
+    """
+
+    CORRUPTIONS = ("category_path", "channel", "timestamps", "json")
+
+    def __init__(self, combos, latency: float = 0.2, row_delay: float = 0.002, error_rate: float = 0.0,
+                 bad_rate: float = 0.0, rps: float = 0.0, capacity: int = 0, seed: Optional[int] = None):
+        self.combos = combos
+        self.paths = [f"{l1} > {l2} > {l3}" for l1, l2, l3, _ in combos]
+        self.latency = latency
+        self.row_delay = row_delay
+        self.error_rate = error_rate
+        self.bad_rate = bad_rate
+        self.rps = rps
+        self.capacity = capacity
+        self.rng = random.Random(seed)
+        self.active = 0
+        self.calls: deque = deque()
+
+    def _admit(self):
+        now = time.monotonic()
+        if self.rps:
+            while self.calls and now - self.calls[0] >= 1.0:
+                self.calls.popleft()
+            if len(self.calls) >= self.rps:
+                raise BackendError("HTTP 429 (mock rate limit)", retry_after=1.0 - (now - self.calls[0]))
+            self.calls.append(now)
+        if self.capacity and self.active >= self.capacity:
+            raise BackendError("HTTP 503 (mock at capacity)")
+
+    def _corrupt(self, t: Dict[str, Any]) -> str:
+        kind = self.rng.choice(self.CORRUPTIONS)
+        if kind == "category_path":
+            t["category_path"] = self.rng.choice(self.paths)
+        elif kind == "channel":
+            t["channel"] = t["channel"].upper()
+        elif kind == "timestamps":
+            t["created_at"], t["updated_at"] = t["updated_at"], t["created_at"]
+        line = dumps_line(t)
+        return line[:len(line) // 2] + "\n" if kind == "json" else line
+
+    def _generate(self, request: Request) -> List[str]:
+        lines = []
+        for seq in range(request.first_seq, request.first_seq + request.n):
+            t = make_ticket(self.rng, f"{request.id_prefix}{seq:03d}", self.combos, "mock")
+            lines.append(self._corrupt(t) if self.rng.random() < self.bad_rate else dumps_line(t))
+        return lines
+
+    @staticmethod
+    def _fix(t: Dict[str, Any]) -> Dict[str, Any]:
+        t = dict(t)
+        levels = (t.get("category_level_1"), t.get("category_level_2"), t.get("category_level_3"))
+        t["category_path"] = " > ".join(map(str, levels))
+        t["labels_json"] = {"l1": levels[0], "l2": levels[1], "l3": levels[2], "tags": t.get("tags")}
+        for k, allowed, fallback in (("channel", ALLOWED_CHANNELS, "portal"), ("sentiment", ALLOWED_SENTIMENT, "neutral")):
+            v = t.get(k).strip().lower() if isinstance(t.get(k), str) else None
+            t[k] = v if v in allowed else fallback
+        if str(t.get("updated_at")) < str(t.get("created_at")):
+            t["created_at"], t["updated_at"] = t["updated_at"], t["created_at"]
+        if isinstance(t.get("impact"), int) and isinstance(t.get("urgency"), int):
+            t["priority"] = compute_priority(t["impact"], t["urgency"])
+        return t
+
+    async def stream(self, request: Request) -> AsyncIterator[str]:
+        self._admit()
+        self.active += 1
+        try:
+            await asyncio.sleep(self.latency * (0.5 + self.rng.random()))
+            if request.kind == "generate":
+                lines = self._generate(request)
+            else:
+                lines = [dumps_line(self._fix(r["ticket"])) for r in request.records]
+            fail_at = self.rng.randrange(len(lines) + 1) if self.rng.random() < self.error_rate else -1
+            for i, line in enumerate(lines):
+                if i == fail_at:
+                    raise BackendError("mock connection reset")
+                if self.row_delay:
+                    await asyncio.sleep(self.row_delay)
+                yield line
+            if fail_at == len(lines):
+                raise BackendError("mock connection reset")
+        finally:
+            self.active -= 1
+
+
+async def iter_lines(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Complete, non-blank lines of a streamed response, skipping markdown fences."""
+    buf = ""
+    async with aclosing(chunks):
+        async for text in chunks:
+            buf += text
+            *lines, buf = buf.split("\n")
+            for line in lines:
+                line = line.strip()
+                if line and not line.startswith("```"):
+                    yield line
+    line = buf.strip()
+    if line and not line.startswith("```"):
+        yield line
+
+
+# ---------- Outputs ----------
+class PartWriter:
+    """Appends clean rows to out_dir/part_NNN.jsonl, starting a new part every part_size rows."""
+
+    def __init__(self, out_dir: str, part_size: int, first: Optional[int] = None):
+        os.makedirs(out_dir, exist_ok=True)
+        if first is None:
+            taken = [int(m.group(1)) for p in glob.glob(os.path.join(out_dir, "part_*.jsonl"))
+                     if (m := re.fullmatch(r"part_(\d+)\.jsonl", os.path.basename(p)))]
+            first = max(taken, default=0) + 1
+        self.out_dir = out_dir
+        self.part_size = part_size
+        self.index = first
+        self.f = None
+        self.n = 0
+        self.paths: List[str] = []
+
+    def write(self, obj: Dict[str, Any]):
+        if self.f is None or self.n >= self.part_size:
+            self.close()
+            path = os.path.join(self.out_dir, f"part_{self.index:03d}.jsonl")
+            self.index += 1
+            self.f = open(path, "w", encoding="utf-8")
+            self.paths.append(path)
+            self.n = 0
+        self.f.write(dumps_line(obj))
+        self.n += 1
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+# ---------- Driver ----------
+class Driver:
+    def __init__(self, backend, validator: RowValidator, writer: PartWriter, rejected_path: str,
+                 allowed_paths: List[str], dialect: str = "Egyptian", concurrency: int = 4,
+                 bucket: Optional[TokenBucket] = None, retries: int = 5, backoff: float = 1.0,
+                 backoff_cap: float = 60.0, fix_batch: int = 20, max_fix_rounds: int = 2,
+                 prompts_dir: Path = PROMPTS_DIR):
+        self.backend = backend
+        self.validator = validator
+        self.writer = writer
+        self.rejected_path = rejected_path
+        self.allowed_paths = allowed_paths
+        self.dialect = dialect
+        self.concurrency = concurrency
+        self.bucket = bucket or TokenBucket(0)
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+        self.fix_batch = fix_batch
+        self.max_fix_rounds = max_fix_rounds
+        self.generation_prompt = (prompts_dir / "generation_v1.md").read_text(encoding="utf-8")
+        self.fixer_prompt = (prompts_dir / "fixer_v1.md").read_text(encoding="utf-8")
+
+        self.gen_jobs: deque = deque()
+        self.fix_queue: List[Tuple[Dict[str, Any], int]] = []
+        self.active = 0
+        self.cond = asyncio.Condition()
+        self.seen_ids: set = set()
+        self.rej_f = None
+        self.stats: Counter = Counter()
+        # REPAIR_RULES applied to otherwise valid rows
+        self.repairs: Counter = Counter()
+
+    # ----- prompts -----
+    def _taxonomy_block(self) -> str:
+        return "Allowed category paths (TAXONOMY_FILE):\n" + "\n".join(self.allowed_paths)
+
+    def request(self, job: Job) -> Request:
+        if job.kind == "generate":
+            user = (f"TAXONOMY_FILE = the allowed category paths below\nN = {job.n}\nDIALECT = {self.dialect}\n"
+                    f"OUTPUT_FILE = this reply\nticket_id values: {job.id_prefix}{job.next_seq:03d} counting up\n\n"
+                    + self._taxonomy_block())
+            return Request("generate", [{"role": "system", "content": self.generation_prompt},
+                                        {"role": "user", "content": user}],
+                           job.n, job.id_prefix, job.next_seq)
+        records = [rec for rec, _ in job.fixes]
+        user = ("TAXONOMY_FILE = the allowed category paths below\nINPUT_FILE = the lines after INPUT\n"
+                "OUTPUT_FILE = this reply\n\n" + self._taxonomy_block() + "\n\nINPUT\n"
+                + "".join(dumps_line(r) for r in records))
+        return Request("fix", [{"role": "system", "content": self.fixer_prompt},
+                               {"role": "user", "content": user}],
+                       len(records), records=records)
+
+    # ----- row handling -----
+    def reject(self, record: Dict[str, Any]):
+        if self.rej_f is None:
+            self.rej_f = open(self.rejected_path, "w", encoding="utf-8")
+        self.rej_f.write(dumps_line(record))
+        self.stats["rejected"] += 1
+
+    def check(self, line: str, source: str, line_no: int, fix_round: int) -> bool:
+        """Write a valid row, queue an invalid one for fixing; False if the line is not a JSON object."""
+        try:
+            obj = loads(line)
+        except Exception:
+            obj = None
+        if type(obj) is not dict:
+            self.reject({"source": source, "line": line_no, "reason": ["bad:json_parse"], "raw": line})
+            return False
+        kind, rec = check_row(obj, self.validator(obj), self.seen_ids, source, line_no, self.validator, self.repairs)
+        if kind == "clean":
+            self.writer.write(rec)
+            self.stats["written"] += 1
+            if fix_round:
+                self.stats["fixed"] += 1
+        elif fix_round < self.max_fix_rounds:
+            self.fix_queue.append((rec, fix_round + 1))
+            self.stats["queued_for_fix"] += 1
+        else:
+            self.reject(rec)
+        return True
+
+    async def consume(self, job: Job):
+        """Stream one response into the outputs, shrinking job to the rows still missing."""
+        async with aclosing(iter_lines(self.backend.stream(self.request(job)))) as lines:
+            async for line in lines:
+                if job.kind == "generate":
+                    seq = job.next_seq
+                    job.next_seq += 1
+                    self.stats["lines"] += 1
+                    if self.check(line, f"llm:{job.id_prefix.rstrip('-')}", seq, 0):
+                        job.n -= 1
+                    if job.n == 0:
+                        break
+                else:
+                    rec, fix_round = job.fixes.popleft()
+                    self.stats["lines"] += 1
+                    if not self.check(line, rec.get("source", "llm:fix"), rec.get("line", 0), fix_round):
+                        # Unusable answer; keep the ticket for another round if it has one
+                        if fix_round < self.max_fix_rounds:
+                            self.fix_queue.append((rec, fix_round + 1))
+                        else:
+                            self.reject(rec)
+                    job.n -= 1
+                    if job.n == 0:
+                        break
+
+    async def run_job(self, job: Job):
+        try:
+            while job.n > 0:
+                await self.bucket.acquire()
+                self.stats["requests"] += 1
+                error = None
+                try:
+                    await self.consume(job)
+                except BackendError as e:
+                    if not e.retryable:
+                        raise
+                    self.stats["errors"] += 1
+                    error = e
+                if job.n == 0:
+                    break
+                job.attempt += 1
+                if job.attempt > self.retries:
+                    if job.kind == "generate":
+                        self.stats["shortfall"] += job.n
+                    for rec, _ in job.fixes:
+                        self.reject(rec)
+                    break
+                self.stats["retries"] += 1
+                # A short but successful response is asked again for the rest straight away
+                if error is not None:
+                    await asyncio.sleep(error.retry_after if error.retry_after is not None
+                                        else backoff_delay(job.attempt, self.backoff, self.backoff_cap))
+        finally:
+            async with self.cond:
+                self.active -= 1
+                self.cond.notify_all()
+
+    async def next_job(self) -> Optional[Job]:
+        async with self.cond:
+            while True:
+                # Fixes first: a full batch, or whatever is left once generation is handed out
+                if len(self.fix_queue) >= self.fix_batch or (self.fix_queue and not self.gen_jobs):
+                    fixes = self.fix_queue[:self.fix_batch]
+                    del self.fix_queue[:self.fix_batch]
+                    job = Job("fix", len(fixes), fixes=fixes)
+                elif self.gen_jobs:
+                    job = self.gen_jobs.popleft()
+                elif self.active:
+                    await self.cond.wait()
+                    continue
+                else:
+                    return None
+                self.active += 1
+                return job
+
+    async def worker(self):
+        while True:
+            job = await self.next_job()
+            if job is None:
+                return
+            await self.run_job(job)
+
+    async def run(self, count: int, per_request: int, id_prefix: str = "TCKT-LLM"):
+        for i, start in enumerate(range(0, count, per_request), start=1):
+            self.gen_jobs.append(Job("generate", min(per_request, count - start), f"{id_prefix}-{i:05d}-"))
+        try:
+            await asyncio.gather(*(self.worker() for _ in range(self.concurrency)))
+        finally:
+            self.writer.close()
+            if self.rej_f is not None:
+                self.rej_f.close()
+
+
+# ---------- CLI ----------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate tickets with an LLM: rate-limited, retried, validated as they stream in.")
+    parser.add_argument("--count", type=int, required=True, help="Valid tickets to generate")
+    parser.add_argument("--per-request", type=int, default=50, help="Tickets asked for per generation request (default: 50)")
+    parser.add_argument("--taxonomy", default="taxonomy_itsm_v1.json", help="Taxonomy JSON (default: taxonomy_itsm_v1.json)")
+    parser.add_argument("--dialect", default="Egyptian", help="DIALECT for the generation prompt (default: Egyptian)")
+    parser.add_argument("--id-prefix", default="TCKT-LLM", help="ticket_ids are <PREFIX>-<request>-<seq> (default: TCKT-LLM)")
+    parser.add_argument("--prompts-dir", default=str(PROMPTS_DIR), help="Directory with generation_v1.md and fixer_v1.md")
+    parser.add_argument("--out-dir", default="parts", help="Directory for the part files (default: parts)")
+    parser.add_argument("--part-size", type=int, default=10_000, help="Rows per part file (default: 10000)")
+    parser.add_argument("--first-part", type=int, default=None, help="First part number (default: after the highest in --out-dir)")
+    parser.add_argument("--out-rejected", default="llm_rejected.jsonl", help="Rows that could not be fixed (default: llm_rejected.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once (default: 4)")
+    parser.add_argument("--rps", type=float, default=1.0, help="Requests started per second on average; 0 for no limit (default: 1)")
+    parser.add_argument("--burst", type=float, default=4, help="Requests that may start back to back (default: 4)")
+    parser.add_argument("--retries", type=int, default=5, help="Retries per request before giving up on its remaining rows (default: 5)")
+    parser.add_argument("--backoff", type=float, default=1.0, help="First retry delay in seconds, doubled per attempt (default: 1)")
+    parser.add_argument("--backoff-cap", type=float, default=60.0, help="Longest retry delay in seconds (default: 60)")
+    parser.add_argument("--fix-batch", type=int, default=20, help="Rejected rows per fixer request (default: 20)")
+    parser.add_argument("--max-fix-rounds", type=int, default=2, help="Fixer passes a row gets before it is rejected (default: 2)")
+
+    parser.add_argument("--backend", choices=("mock", "openai"), default="mock", help="LLM backend (default: mock)")
+    parser.add_argument("--base-url", default="https://api.openai.com/v1", help="openai: API base URL")
+    parser.add_argument("--model", default=None, help="openai: model name")
+    parser.add_argument("--api-key-env", default="OPENAI_API_KEY", help="openai: environment variable holding the API key")
+    parser.add_argument("--timeout", type=float, default=300.0, help="openai: seconds per request (default: 300)")
+    parser.add_argument("--mock-latency", type=float, default=0.2, help="mock: mean seconds before the first line (default: 0.2)")
+    parser.add_argument("--mock-row-delay", type=float, default=0.002, help="mock: seconds between streamed lines (default: 0.002)")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0, help="mock: share of requests that fail (default: 0)")
+    parser.add_argument("--mock-bad-rate", type=float, default=0.0, help="mock: share of generated rows that are invalid (default: 0)")
+    parser.add_argument("--mock-rps", type=float, default=0.0, help="mock: answer 429 above this many requests per second (default: off)")
+    parser.add_argument("--mock-capacity", type=int, default=0, help="mock: answer 503 above this many concurrent requests (default: off)")
+    parser.add_argument("--seed", type=int, default=None, help="mock: seed for the generated rows")
+    args = parser.parse_args()
+    if args.backend == "openai" and not args.model:
+        parser.error("--backend openai needs --model")
+    return args
+
+
+def main():
+    args = parse_args()
+    allowed_paths, triple_meta = load_taxonomy(args.taxonomy)
+    if args.backend == "mock":
+        backend = MockBackend(load_combos(Path(args.taxonomy)), args.mock_latency, args.mock_row_delay,
+                              args.mock_error_rate, args.mock_bad_rate, args.mock_rps, args.mock_capacity, args.seed)
+    else:
+        backend = OpenAIBackend(args.base_url, args.model, os.environ.get(args.api_key_env), args.timeout,
+                                max_workers=args.concurrency)
+
+    writer = PartWriter(args.out_dir, args.part_size, args.first_part)
+    driver = Driver(backend, RowValidator(triple_meta), writer, args.out_rejected, sorted(allowed_paths),
+                    args.dialect, args.concurrency, TokenBucket(args.rps, args.burst), args.retries,
+                    args.backoff, args.backoff_cap, args.fix_batch, args.max_fix_rounds, Path(args.prompts_dir))
+
+    t0 = time.perf_counter()
+    try:
+        asyncio.run(driver.run(args.count, args.per_request, args.id_prefix))
+    except BackendError as e:
+        raise SystemExit(f"Backend error: {e}")
+    elapsed = time.perf_counter() - t0
+
+    s = driver.stats
+    print(f"Requests: {s['requests']} ({s['errors']} failed, {s['retries']} retries)")
+    print(f"Lines received: {s['lines']}")
+    print(f"Valid rows written: {s['written']} ({s['fixed']} after fixing) to {', '.join(writer.paths) or '-'}")
+    if driver.repairs:
+        print("Auto-repaired (rule: rows): " + ", ".join(f"{name}: {n}" for name, n in driver.repairs.most_common()))
+    print(f"Rows sent to the fixer: {s['queued_for_fix']}")
+    print(f"Rejected rows: {s['rejected']}" + (f" (written to {args.out_rejected})" if s["rejected"] else ""))
+    if s["shortfall"]:
+        print(f"Short by {s['shortfall']} rows after {args.retries} retries")
+    print(f"Elapsed: {elapsed:.1f}s ({s['written'] / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
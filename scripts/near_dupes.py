@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for ticket JSONL files (MinHash + LSH banding).
+
+Each ticket's title_ar + description_ar is normalized with
+arabic_norm.normalize_ar (the same folding as dedupe_variants.py and
+dq_report.py --normalized), lowercased and whitespace-collapsed, then cut
+into character k-shingles. Every ticket gets a MinHash signature, and
+signatures are bucketed band by band. Only tickets that share a bucket are compared,
+using the fraction of agreeing signature slots as an estimate of their
+shingle Jaccard similarity. Pairs at or above --threshold are merged with
+union-find into clusters.
+
+Work is linear in the number of tickets plus the number of candidate pairs,
+and memory is one signature (4 bytes per permutation) per ticket. Rows are
+streamed, and a second pass writes the output.
+
+Modes:
+  report      only write the cluster report (default)
+  keep-first  keep the first ticket of every cluster, drop the rest
+  drop        drop every ticket that belongs to a cluster
+
+Usage: near_dupes.py IN.jsonl [--out OUT.jsonl] [--report CLUSTERS.jsonl]
+                     [--mode report|keep-first|drop] [--threshold 0.8]
+"""
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from arabic_norm import normalize_ar
+from jsonl_io import dumps_line, loads
+
+NUM_PERM = 128
+SHINGLE = 5
+THRESHOLD = 0.8
+# Tickets hashed per vectorized MinHash step; bounds the (perm x shingle) temporary
+CHUNK_DOCS = 128
+# Per LSH bucket, how many non-matching members are kept as comparison anchors
+MAX_ANCHORS = 8
+SEED = 1
+
+
+def normalize(text: str) -> str:
+    return " ".join(normalize_ar(text).lower().split())
+
+
+def ticket_text(obj: Dict, fields: Tuple[str, ...]) -> str:
+    return normalize(" ".join(str(obj.get(f) or "") for f in fields))
+
+
+# ---------- MinHash ----------
+class MinHasher:
+    """MinHash signatures over character k-shingles, vectorized across a chunk of texts.
+
+    Shingles are hashed with a rolling polynomial hash over code points, then
+    mixed to 32 bits. Each permutation is the multiply-shift family
+    ((a * x + b) mod 2^64) >> 32, with odd 64-bit a.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle: int = SHINGLE, seed: int = SEED):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.a = (rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    def shingle_hashes(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """32-bit shingle hashes of all texts, concatenated, and each text's start index."""
+        k = self.shingle
+        # Texts shorter than k become one shingle, padded with NULs
+        padded = [t if len(t) >= k else t + "\0" * (k - len(t)) for t in texts]
+        lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+        cp = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+        n = len(cp) - k + 1
+        h = np.zeros(n, dtype=np.uint64)
+        base = np.uint64(0x100000001B3)
+        with np.errstate(over="ignore"):
+            for j in range(k):
+                h = h * base + cp[j:j + n]
+            h ^= h >> np.uint64(29)
+            h *= np.uint64(0xBF58476D1CE4E5B9)
+            h ^= h >> np.uint64(32)
+
+        # Keep only k-grams that start and end inside the same text
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        counts = lengths - k + 1
+        pos = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts) + np.arange(counts.sum())
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        return (h[pos] & np.uint64(0xFFFFFFFF)), offsets
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), num_perm) uint32 signatures."""
+        x, offsets = self.shingle_hashes(texts)
+        with np.errstate(over="ignore"):
+            perm = (self.a * x[None, :] + self.b) >> np.uint64(32)
+        return np.minimum.reduceat(perm, offsets, axis=1).T.astype(np.uint32)
+
+
+# ---------- LSH + clustering ----------
+def lsh_params(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows == num_perm and the S-curve midpoint closest below threshold.
+
+    Erring low trades extra candidate checks (which verification filters
+    out) for fewer missed pairs near the threshold.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows == 0 and (rows * 1.0 / num_perm) ** (1.0 / rows) <= threshold:
+            best = (num_perm // rows, rows)
+    return best
+
+
+class UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # Smaller index as root, so a cluster's root is its first ticket
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def similarity(sig: np.ndarray, i: int, j: int) -> float:
+    return float(np.count_nonzero(sig[i] == sig[j])) / sig.shape[1]
+
+
+def lsh_clusters(sig: np.ndarray, threshold: float = THRESHOLD, valid: Optional[np.ndarray] = None) -> UnionFind:
+    """Union-find over tickets whose estimated similarity reaches threshold.
+
+    valid masks out tickets that must not be clustered (e.g. empty text).
+    """
+    n, num_perm = sig.shape
+    bands, rows = lsh_params(num_perm, threshold)
+    uf = UnionFind(n)
+    if n < 2:
+        return uf
+    idx_all = np.arange(n) if valid is None else np.flatnonzero(valid)
+    mult = np.random.default_rng(SEED).integers(1, 1 << 63, size=rows, dtype=np.uint64) | np.uint64(1)
+
+    for band in range(bands):
+        cols = sig[idx_all, band * rows:(band + 1) * rows].astype(np.uint64)
+        with np.errstate(over="ignore"):
+            keys = (cols * mult).sum(axis=1, dtype=np.uint64)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        # Runs of equal keys with more than one member are the candidate buckets
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(sorted_keys)]))
+        for s, e in zip(starts[ends - starts > 1].tolist(), ends[ends - starts > 1].tolist()):
+            members = idx_all[order[s:e]].tolist()
+            anchors = [members[0]]
+            for j in members[1:]:
+                rj = uf.find(j)
+                for a in anchors:
+                    if uf.find(a) == rj:
+                        break
+                    if similarity(sig, a, j) >= threshold:
+                        uf.union(a, j)
+                        break
+                else:
+                    if len(anchors) < MAX_ANCHORS:
+                        anchors.append(j)
+    return uf
+
+
+def cluster_members(uf: UnionFind) -> Dict[int, List[int]]:
+    """root -> sorted member indices, for clusters of two or more tickets."""
+    roots = np.fromiter((uf.find(i) for i in range(len(uf.parent))), dtype=np.int64, count=len(uf.parent))
+    order = np.argsort(roots, kind="stable")
+    clusters: Dict[int, List[int]] = {}
+    bounds = np.flatnonzero(np.diff(roots[order])) + 1
+    for group in np.split(order, bounds):
+        if len(group) > 1:
+            clusters[int(roots[group[0]])] = group.tolist()
+    return clusters
+
+
+# ---------- IO ----------
+def iter_tickets(path: str) -> Iterator[Tuple[str, Dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line, loads(line)
+
+
+def signature_file(path: str, hasher: MinHasher, fields: Tuple[str, ...]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """(ticket_ids, signatures, non-empty mask) for every ticket of a JSONL file."""
+    ids: List[str] = []
+    sigs: List[np.ndarray] = []
+    nonempty: List[bool] = []
+    texts: List[str] = []
+    for _, obj in iter_tickets(path):
+        text = ticket_text(obj, fields)
+        ids.append(obj.get("ticket_id"))
+        nonempty.append(bool(text))
+        texts.append(text)
+        if len(texts) == CHUNK_DOCS:
+            sigs.append(hasher.signatures(texts))
+            texts = []
+    if texts:
+        sigs.append(hasher.signatures(texts))
+    sig = np.concatenate(sigs) if sigs else np.empty((0, hasher.num_perm), dtype=np.uint32)
+    return ids, sig, np.array(nonempty, dtype=bool)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Find near-duplicate tickets with MinHash + LSH.")
+    parser.add_argument("input", help="Input JSONL")
+    parser.add_argument("--out", default=None, help="Deduplicated JSONL (required for keep-first/drop)")
+    parser.add_argument("--report", default=None, help="Cluster report JSONL (one cluster per line)")
+    parser.add_argument("--mode", choices=("report", "keep-first", "drop"), default="report")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help=f"Estimated Jaccard threshold (default: {THRESHOLD})")
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM, help=f"MinHash permutations (default: {NUM_PERM})")
+    parser.add_argument("--shingle", type=int, default=SHINGLE, help=f"Character shingle size (default: {SHINGLE})")
+    parser.add_argument("--fields", nargs="+", default=["title_ar", "description_ar"], help="Text fields to compare")
+    args = parser.parse_args()
+    if args.mode != "report" and not args.out:
+        parser.error(f"--mode {args.mode} needs --out")
+    return args
+
+
+def main():
+    args = parse_args()
+    hasher = MinHasher(args.num_perm, args.shingle)
+    ids, sig, nonempty = signature_file(args.input, hasher, tuple(args.fields))
+    uf = lsh_clusters(sig, args.threshold, valid=nonempty)
+    clusters = cluster_members(uf)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            for n, (root, members) in enumerate(sorted(clusters.items())):
+                f.write(dumps_line({
+                    "cluster": n,
+                    "size": len(members),
+                    "keep": ids[root],
+                    "members": [{"ticket_id": ids[i], "similarity": round(similarity(sig, root, i), 4)} for i in members],
+                }))
+
+    in_cluster = sum(len(m) for m in clusters.values())
+    if args.mode == "keep-first":
+        dropped = {i for members in clusters.values() for i in members[1:]}
+    elif args.mode == "drop":
+        dropped = {i for members in clusters.values() for i in members}
+    else:
+        dropped = set()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fo:
+            for i, (line, _) in enumerate(iter_tickets(args.input)):
+                if i not in dropped:
+                    fo.write(line if line.endswith("\n") else line + "\n")
+
+    bands, rows = lsh_params(args.num_perm, args.threshold)
+    print(f"Tickets: {len(ids)}")
+    print(f"LSH: {bands} bands x {rows} rows, threshold {args.threshold}")
+    print(f"Near-duplicate clusters: {len(clusters)} ({in_cluster} tickets)")
+    if args.mode != "report":
+        print(f"Dropped ({args.mode}): {len(dropped)}")
+        print(f"Wrote: {args.out}")
+    if args.report:
+        print(f"Cluster report: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
-import sys, json, re, random
+import argparse, re, random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
 
+from jsonl_io import dumps_line, loads
+from taxonomy_resolver import DEFAULT_THRESHOLD, TaxonomyResolver
+
 ALLOWED_L3_MAP = {
     ("Software","Office Apps","Excel Crash"): ("Software","Office Apps","Crash"),
     ("Software","Office Apps","Performance"): ("Software","Office Apps","Word/Excel"),
@@ -13,6 +19,7 @@ OFFICE_VERS = ["Office 365 v2401","Office 365 v2402","Office 2019","Office LTSC
 WIFI_SSIDS = ["Company-Secure","Company-Guest","HQ-Floor3","Warehouse-AP"]
 VPN_ERRORS = ["Error 809","Timeout","IKE Auth failed","Certificate expired"]
 OUTLOOK_ERRORS = ["0x8004010F","0x800CCC0E","OST corruption","Add-in conflict"]
+
 TONE_SNIPPETS = [
  "محتاج الموضوع يتحل بسرعة لو سمحتوا.",
  "جربت ريستارت وكمان عملت Repair بس نفس المشكلة.",
@@ -50,37 +57,94 @@ def expand_desc(seed:int,l1,l2,l3,title,desc):
     return " ".join(s if s.endswith('.') else s+"." for s in sentences)
 
 
+def process_ticket(obj, resolver=None):
+    """Remap categories, fix priority and enrich a short description, in place.
+
+    With a TaxonomyResolver, triples ALLOWED_L3_MAP does not know are
+    remapped to their nearest allowed leaf when one is close enough.
+    """
+    l1=obj.get('category_level_1'); l2=obj.get('category_level_2'); l3=obj.get('category_level_3')
+    key=(l1,l2,l3)
+    new=ALLOWED_L3_MAP.get(key)
+    if new is None and resolver is not None:
+        match=resolver.resolve(l1,l2,l3,tags=obj.get('tags') or ())
+        if match and match[0]!=key:
+            new=match[0]
+    if new is not None:
+        nl1,nl2,nl3=new
+        obj['category_level_1']=nl1; obj['category_level_2']=nl2; obj['category_level_3']=nl3
+        obj['category_path']=f"{nl1} > {nl2} > {nl3}"
+        obj['labels_json']={'l1':nl1,'l2':nl2,'l3':nl3,'tags':obj.get('tags',[])}
+    # fix priority
+    try:
+        imp=int(obj.get('impact',0)); urg=int(obj.get('urgency',0))
+        obj['priority']=prio(imp,urg)
+    except Exception:
+        pass
+    # enrich short or duplicate-looking descriptions
+    desc = obj.get('description_ar') or ''
+    title = obj.get('title_ar') or ''
+    seed = sum(ord(c) for c in obj.get('ticket_id',''))
+    if len(desc)<90:
+        obj['description_ar']=expand_desc(seed,l1,l2,obj.get('category_level_3'),title,desc)
+    return obj
+
+
+def process_line(line:str, resolver=None)->str:
+    return dumps_line(process_ticket(loads(line), resolver))
+
+
+def process_chunk(lines, resolver=None)->str:
+    return "".join(process_line(line, resolver) for line in lines if line.strip())
+
+
+# Lines per unit of work handed to a worker
+CHUNK_LINES = 20_000
+
+
+def iter_chunks(f, size:int=CHUNK_LINES):
+    while True:
+        chunk=list(islice(f, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_processed(f, workers:int=1, resolver=None):
+    """Postprocessed text of each chunk of f, in input order.
+
+    Every row only depends on itself (expand_desc is seeded from ticket_id),
+    so chunks can go to a process pool; at most 2*workers chunks are in
+    flight, which keeps memory flat on large parts.
+    """
+    if workers<=1:
+        for chunk in iter_chunks(f):
+            yield process_chunk(chunk, resolver)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending=deque()
+        for chunk in iter_chunks(f):
+            pending.append(ex.submit(process_chunk, chunk, resolver))
+            if len(pending)>=2*workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def main():
-    if len(sys.argv)<3:
-        print("Usage: postprocess_v2.py <IN.jsonl> <OUT.jsonl>", file=sys.stderr)
-        sys.exit(2)
-    inp = Path(sys.argv[1]); outp=Path(sys.argv[2])
+    parser=argparse.ArgumentParser(description="Fix categories/priority and enrich short descriptions.")
+    parser.add_argument("input", help="Input JSONL")
+    parser.add_argument("output", help="Output JSONL")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes; output is identical for any value")
+    parser.add_argument("--taxonomy", default=None, help="Taxonomy JSON; also remap unknown category triples to the nearest allowed leaf")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Minimum match confidence for --taxonomy (default: {DEFAULT_THRESHOLD})")
+    args=parser.parse_args()
+    resolver = TaxonomyResolver.load(args.taxonomy, args.threshold) if args.taxonomy else None
+    inp = Path(args.input); outp=Path(args.output)
     outp.parent.mkdir(parents=True, exist_ok=True)
     with inp.open('r', encoding='utf-8') as fi, outp.open('w', encoding='utf-8') as fo:
-        for line in fi:
-            if not line.strip():
-                continue
-            obj=json.loads(line)
-            l1=obj.get('category_level_1'); l2=obj.get('category_level_2'); l3=obj.get('category_level_3')
-            key=(l1,l2,l3)
-            if key in ALLOWED_L3_MAP:
-                nl1,nl2,nl3=ALLOWED_L3_MAP[key]
-                obj['category_level_1']=nl1; obj['category_level_2']=nl2; obj['category_level_3']=nl3
-                obj['category_path']=f"{nl1} > {nl2} > {nl3}"
-                obj['labels_json']={'l1':nl1,'l2':nl2,'l3':nl3,'tags':obj.get('tags',[])}
-            # fix priority
-            try:
-                imp=int(obj.get('impact',0)); urg=int(obj.get('urgency',0))
-                obj['priority']=prio(imp,urg)
-            except Exception:
-                pass
-            # enrich short or duplicate-looking descriptions
-            desc = obj.get('description_ar') or ''
-            title = obj.get('title_ar') or ''
-            seed = sum(ord(c) for c in obj.get('ticket_id',''))
-            if len(desc)<90:
-                obj['description_ar']=expand_desc(seed,l1,l2,obj.get('category_level_3'),title,desc)
-            fo.write(json.dumps(obj, ensure_ascii=False)+"\n")
+        for text in iter_processed(fi, args.workers, resolver):
+            fo.write(text)
 
 if __name__=='__main__':
     main()
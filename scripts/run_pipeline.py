@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Single-pass pipeline: postprocess -> dedupe -> dq report -> validate/build.
+
+Runs the same stages as
+
+    postprocess_v2.py | dedupe_variants.py | dq_report.py | build_dataset.py
+
+but every input line is decoded once into a dict, passed through the
+stages as in-process generator transforms, and encoded once by the build
+writers. No intermediate JSONL is written or re-parsed unless asked for
+with --materialize DIR, which tees each stage's output to DIR/<stage>.jsonl
+for debugging.
+
+Outputs match the serial flow (clean JSONL/CSV/Parquet, index, dq report).
+The one difference: rejected rows point at the original input file and
+line rather than at a line of the dedupe output, and lines that are not
+valid JSON reach the rejected file instead of stopping postprocess.
+
+Usage:
+    run_pipeline.py --input-glob "parts/part_*.jsonl" --dq-report dq.txt
+    run_pipeline.py --stages dedupe --materialize debug/
+"""
+import argparse
+import glob
+import os
+from collections import Counter
+from functools import partial
+from typing import Any, Iterator, List, Optional, Tuple
+
+from build_dataset import (PARQUET_ROW_GROUP_SIZE, RowMeta, RowValidator, check_row,
+                           load_taxonomy, pa, write_streaming)
+from dedupe_variants import dedupe_ticket
+from dq_stats import DQStats
+from jsonl_io import dumps_line, loads
+from postprocess_v2 import process_ticket
+from taxonomy_resolver import DEFAULT_THRESHOLD, TaxonomyResolver
+from ticket_store import build_index, default_index_path
+
+# (source file, line, offset) for build_dataset compatibility, the stripped
+# line when it is not valid JSON, and the decoded row (None if unparsed)
+Row = Tuple[RowMeta, Optional[str], Any]
+
+STAGES = ("postprocess", "dedupe")
+
+
+# ---------- CLI ----------
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Postprocess, dedupe and build a clean dataset in one pass over the input parts."
+    )
+    parser.add_argument("--taxonomy", default="taxonomy_itsm_v1.json",
+                        help="Path to taxonomy JSON file (default: taxonomy_itsm_v1.json)")
+    parser.add_argument("--input-glob", default="parts/part_*.jsonl",
+                        help="Glob pattern for input JSONL part files (default: parts/part_*.jsonl)")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"Comma-separated transforms to run before validation, in order (default: {','.join(STAGES)}; '' for none)")
+    parser.add_argument("--resolve-categories", action="store_true",
+                        help="Remap unknown category triples to the nearest allowed leaf, in postprocess and as a repair rule")
+    parser.add_argument("--resolve-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Minimum resolver confidence for --resolve-categories (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--normalize-text", action="store_true",
+                        help="Add normalized text columns (arabic_norm.py); dedupe and --dq-report then compare normalized text")
+    parser.add_argument("--materialize", default=None,
+                        help="Also write each stage's output to DIR/<stage>.jsonl")
+    parser.add_argument("--out-jsonl", default="dataset_clean.jsonl",
+                        help="Output path for clean JSONL (default: dataset_clean.jsonl)")
+    parser.add_argument("--out-csv", default="dataset_clean.csv",
+                        help="Output path for clean CSV (default: dataset_clean.csv)")
+    parser.add_argument("--out-parquet", default="dataset_clean.parquet",
+                        help="Output Parquet path (needs pyarrow; '' to skip)")
+    parser.add_argument("--parquet-row-group-size", type=int, default=PARQUET_ROW_GROUP_SIZE,
+                        help=f"Max rows per Parquet row group (default: {PARQUET_ROW_GROUP_SIZE})")
+    parser.add_argument("--out-index", default=None,
+                        help="ticket_id index for the clean JSONL (default: next to --out-jsonl as .idx; '' to skip)")
+    parser.add_argument("--out-rejected", default="dataset_rejected.jsonl",
+                        help="Output path for rejected rows JSONL (default: dataset_rejected.jsonl)")
+    parser.add_argument("--dq-report", default=None,
+                        help="Also write the dq_report.py quality report of the deduped rows to this path")
+    parser.add_argument("--dq-sketch", action="store_true",
+                        help="Estimate the --dq-report duplicate stats in fixed memory (dq_report.py --sketch)")
+    args = parser.parse_args()
+    args.stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in args.stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+    return args
+
+
+# ---------- Stages ----------
+def read_rows(files: List[str]) -> Iterator[Row]:
+    """Decode every non-blank line of the input files once."""
+    for fp in files:
+        with open(fp, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = loads(line)
+                except Exception:
+                    yield (fp, line_no, 0), line, None
+                    continue
+                yield (fp, line_no, 0), None, obj
+
+
+def postprocess(rows: Iterator[Row], resolver: Optional[TaxonomyResolver] = None) -> Iterator[Row]:
+    for row in rows:
+        if isinstance(row[2], dict):
+            process_ticket(row[2], resolver)
+        yield row
+
+
+def dedupe(rows: Iterator[Row], normalized: bool = False) -> Iterator[Row]:
+    # One seen set for the whole stream, as dedupe_variants.py keeps for its input
+    seen = set()
+    for row in rows:
+        if isinstance(row[2], dict):
+            dedupe_ticket(row[2], seen, normalized)
+        yield row
+
+
+STAGE_FUNCS = {"postprocess": postprocess, "dedupe": dedupe}
+
+
+def materialize(rows: Iterator[Row], path: str) -> Iterator[Row]:
+    """Write each row as it leaves a stage, before later stages change it."""
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            _, raw, obj = row
+            f.write(raw + "\n" if obj is None else dumps_line(obj))
+            yield row
+
+
+def count_dq(rows: Iterator[Row], dq: DQStats) -> Iterator[Row]:
+    for row in rows:
+        if row[2] is None:
+            dq.add_unparsed()
+        else:
+            dq.add(row[2])
+        yield row
+
+
+def validate(rows: Iterator[Row], validator: RowValidator, repairs: Counter) -> Iterator[Tuple[str, Any, RowMeta]]:
+    """Same events as build_dataset.iter_validated, for write_streaming."""
+    seen_ids = set()
+    for meta, raw, obj in rows:
+        if obj is None:
+            yield "rejected", {"source": meta[0], "line": meta[1], "reason": ["bad:json_parse"], "raw": raw}, meta
+            continue
+        kind, rec = check_row(obj, validator(obj), seen_ids, meta[0], meta[1], validator, repairs)
+        yield kind, rec, meta
+
+
+def main():
+    args = parse_args()
+    if args.out_parquet and pa is None:
+        raise SystemExit("--out-parquet needs pyarrow (pip install pyarrow, or pass --out-parquet '' to skip it)")
+
+    files = sorted(glob.glob(args.input_glob))
+    if not files:
+        raise SystemExit(f"No files matched: {args.input_glob}")
+    _, triple_meta = load_taxonomy(args.taxonomy)
+    validator = RowValidator(triple_meta)
+    if args.resolve_categories:
+        validator.resolver = TaxonomyResolver.load(args.taxonomy, args.resolve_threshold)
+    validator.normalize_text = args.normalize_text
+
+    stage_funcs = dict(STAGE_FUNCS, postprocess=partial(postprocess, resolver=validator.resolver),
+                       dedupe=partial(dedupe, normalized=args.normalize_text))
+    rows = read_rows(files)
+    if args.materialize:
+        os.makedirs(args.materialize, exist_ok=True)
+    for stage in args.stages:
+        rows = stage_funcs[stage](rows)
+        if args.materialize:
+            rows = materialize(rows, os.path.join(args.materialize, f"{stage}.jsonl"))
+
+    dq = DQStats(set(triple_meta), sketch=args.dq_sketch, normalized=args.normalize_text) if args.dq_report else None
+    if dq is not None:
+        rows = count_dq(rows, dq)
+
+    repairs = Counter()
+    n_clean, n_rejected = write_streaming(validate(rows, validator, repairs), args)
+
+    index_path = default_index_path(args.out_jsonl) if args.out_index is None else args.out_index
+    if index_path:
+        build_index(args.out_jsonl, index_path)
+
+    if dq is not None:
+        os.makedirs(os.path.dirname(args.dq_report) or ".", exist_ok=True)
+        with open(args.dq_report, "w", encoding="utf-8") as f:
+            f.write(dq.report())
+
+    print(f"Stages: {' -> '.join(args.stages + ['validate'])}")
+    print(f"Clean rows: {n_clean}")
+    print(f"Rejected rows: {n_rejected}")
+    if repairs:
+        print("Auto-repaired (rule: rows): " + ", ".join(f"{name}: {n}" for name, n in repairs.most_common()))
+    if n_rejected:
+        print(f"Rejected rows written to: {args.out_rejected}")
+
+
+if __name__ == "__main__":
+    main()
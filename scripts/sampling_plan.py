@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Target distributions for generate_tickets_local.py.
+
+A plan is a JSON object of per-dimension weights; any dimension left out
+keeps the generator's uniform draw:
+
+    {"category":  {"Network": 2, "Access > Account": 1, "Service > Incident > Outage": 0.5},
+     "channel":   {"email": 0.4, "portal": 0.3, "chatbot": 0.2, "phone": 0.1},
+     "sentiment": {"negative": 3, "neutral": 1},
+     "impact":    {"1": 1, "2": 2, "3": 3, "4": 2, "5": 1},
+     "urgency":   {"3": 1}}
+
+Category keys are taxonomy paths at any level. A weight on "L1" or
+"L1 > L2" is split evenly over its leaves, and leaves with no matching key
+get none. Weights need not sum to 1.
+
+SamplingPlan.observed() builds a plan from a dataset's own counts. With
+balance=True those counts are not targets but a starting point: N new rows
+are split so each value is topped up toward a common level (water-filling),
+and values the dataset never had, including taxonomy leaves, are filled first.
+
+The generator draws each planned field with an alias table (O(1) per draw,
+within sampling noise of the target), or with --exact from a shuffled quota
+list that hits the target counts per shard (largest-remainder rounding).
+
+Usage: sampling_plan.py DATASET_JSONL [--out PLAN_JSON]
+
+Writes the observed distribution of a dataset as a plan file, ready to edit.
+"""
+import argparse, json, random
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from jsonl_io import iter_jsonl
+
+DIMENSIONS = ("category", "channel", "sentiment", "impact", "urgency")
+
+
+class AliasTable:
+    """Vose's alias method: O(n) setup, O(1) per draw from a discrete distribution."""
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0 or min(weights) < 0:
+            raise ValueError("weights must be non-negative with a positive sum")
+        scaled = [w * n / total for w in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s], alias[s] = scaled[s], l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Leftovers are 1.0 up to rounding error
+        self.n = n
+        self.prob = prob
+        self.alias = alias
+        self._prob = np.array(prob)
+        self._alias = np.array(alias)
+
+    def sample(self, rng: random.Random) -> int:
+        i = int(rng.random() * self.n)
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+    def sample_array(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        i = rng.integers(0, self.n, size)
+        return np.where(rng.random(size) < self._prob[i], i, self._alias[i])
+
+
+def water_fill(counts: Sequence[float], total: int) -> List[float]:
+    """Amounts to add to each count so the smallest rise to a common level, using total in all."""
+    order = sorted(counts)
+    level, used = order[0], 0.0
+    for i, c in enumerate(order):
+        # Raising the i lowest values to c costs i * (c - level)
+        if used + i * (c - level) >= total:
+            break
+        used += i * (c - level)
+        level = c
+    else:
+        i = len(order)
+    level += (total - used) / i
+    return [max(0.0, level - c) for c in counts]
+
+
+def apportion(weights: Sequence[float], total: int) -> List[int]:
+    """Integer counts summing to total, proportional to weights (largest remainder)."""
+    wsum = float(sum(weights))
+    exact = [w * total / wsum for w in weights]
+    counts = [int(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: counts[i] - exact[i])
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+class Sampler:
+    """Draws indices for one dimension of one shard: alias draws, or exact quotas in shuffled order."""
+
+    def __init__(self, weights: Sequence[float], count: int = 0, exact: bool = False):
+        self.table = AliasTable(weights)
+        self.counts = apportion(weights, count) if exact else None
+        self._seq = None
+        self._pos = 0
+
+    def next(self, rng: random.Random) -> int:
+        if self.counts is None:
+            return self.table.sample(rng)
+        if self._seq is None:
+            self._seq = [i for i, c in enumerate(self.counts) for _ in range(c)]
+            rng.shuffle(self._seq)
+        i = self._seq[self._pos]
+        self._pos += 1
+        return i
+
+    def take(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        if self.counts is None:
+            return self.table.sample_array(rng, size)
+        if self._seq is None:
+            self._seq = np.repeat(np.arange(len(self.counts)), self.counts)
+            rng.shuffle(self._seq)
+        out = self._seq[self._pos:self._pos + size]
+        self._pos += size
+        return out
+
+
+class SamplingPlan:
+    def __init__(self, weights: Dict[str, Dict[str, float]], balance_total: Optional[int] = None):
+        unknown = set(weights) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"unknown plan dimensions: {', '.join(sorted(unknown))}")
+        self.weights = {dim: {str(k): float(v) for k, v in w.items()} for dim, w in weights.items()
+                        if w or balance_total}
+        # When set, weights are observed counts to top up with this many rows
+        self.balance_total = balance_total
+
+    def _resolve(self, weights: List[float]) -> List[float]:
+        return water_fill(weights, self.balance_total) if self.balance_total else weights
+
+    @classmethod
+    def load(cls, path: str) -> "SamplingPlan":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def observed(cls, dataset_path: str, balance_total: Optional[int] = None) -> "SamplingPlan":
+        """The dataset's own distribution, or with balance_total the split that evens it out with that many rows."""
+        counts = {dim: Counter() for dim in DIMENSIONS}
+        for obj in iter_jsonl(dataset_path):
+            counts["category"][obj.get("category_path")] += 1
+            for dim in DIMENSIONS[1:]:
+                counts[dim][obj.get(dim)] += 1
+        weights = {dim: {str(k): n for k, n in c.items() if k is not None} for dim, c in counts.items()}
+        if balance_total:
+            # Every dimension takes part, so values missing from the dataset get filled
+            return cls(weights, balance_total)
+        return cls({dim: w for dim, w in weights.items() if w})
+
+    def category_weights(self, leaves: Sequence[Sequence[str]]) -> Optional[List[float]]:
+        """Weight per (l1, l2, l3) leaf, or None if the plan has no category weights."""
+        plan = self.weights.get("category")
+        if plan is None:
+            return None
+        paths = [tuple(leaf[:3]) for leaf in leaves]
+        out = [0.0] * len(paths)
+        for key, w in plan.items():
+            prefix = tuple(p.strip() for p in key.split(">"))
+            under = [i for i, p in enumerate(paths) if p[:len(prefix)] == prefix]
+            if not under:
+                raise ValueError(f"plan category {key!r} matches no taxonomy leaf")
+            for i in under:
+                out[i] += w / len(under)
+        return self._resolve(out)
+
+    def value_weights(self, dim: str, values: Sequence) -> Optional[List[float]]:
+        """Weight per value of a flat dimension, or None if the plan leaves it uniform."""
+        plan = self.weights.get(dim)
+        if plan is None:
+            return None
+        unknown = set(plan) - {str(v) for v in values}
+        if unknown:
+            raise ValueError(f"plan {dim} values not generated: {', '.join(sorted(unknown))}")
+        return self._resolve([plan.get(str(v), 0.0) for v in values])
+
+    def samplers(self, combos, values: Dict[str, Sequence], count: int = 0, exact: bool = False) -> Dict[str, Sampler]:
+        """One Sampler per planned dimension for a shard of count rows."""
+        out = {}
+        cat = self.category_weights(combos)
+        if cat is not None:
+            out["category"] = Sampler(cat, count, exact)
+        for dim, vals in values.items():
+            w = self.value_weights(dim, vals)
+            if w is not None:
+                out[dim] = Sampler(w, count, exact)
+        return out
+
+    def to_json(self) -> str:
+        weights = {dim: {k: int(v) if v.is_integer() else v for k, v in w.items()} for dim, w in self.weights.items()}
+        return json.dumps(weights, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a dataset's category/channel/sentiment/score distribution as a sampling plan.")
+    parser.add_argument("dataset", help="Clean JSONL to measure (e.g. dataset_clean.jsonl)")
+    parser.add_argument("--out", default=None, help="Plan JSON path (default: stdout)")
+    args = parser.parse_args()
+
+    plan = SamplingPlan.observed(args.dataset)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(plan.to_json() + "\n")
+    else:
+        print(plan.to_json())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory sketches for streaming data-quality stats.
+
+- hash64: stable 64-bit hash of a string/bytes key (blake2b), so sketches
+  built in different processes or runs agree.
+- HyperLogLog: distinct-count estimate in 2**p one-byte registers
+  (p=14: 16 KiB, ~0.8% standard error).
+- DistinctSampler: exact occurrence counts for a hash-sampled subset of keys
+  (at most `capacity` of them). When full, the sampling rate halves and keys
+  that no longer qualify are evicted. Scaling sampled figures by 2**level
+  estimates "keys seen more than once" and "extra occurrences".
+
+Both merge associatively, so sketches of separate parts can be combined.
+"""
+import hashlib
+import math
+from typing import Dict, Union
+
+
+def hash64(key: Union[str, bytes]) -> int:
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    def __init__(self, p: int = 14):
+        if not 4 <= p <= 18:
+            raise ValueError("p must be in 4..18")
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self._rest_bits = 64 - p
+        self._rest_mask = (1 << self._rest_bits) - 1
+
+    def add_hash(self, h: int):
+        idx = h >> self._rest_bits
+        rank = self._rest_bits - (h & self._rest_mask).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def add(self, key: Union[str, bytes]):
+        self.add_hash(hash64(key))
+
+    def estimate(self) -> float:
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            return m * math.log(m / zeros)
+        return raw
+
+    def __len__(self) -> int:
+        return int(round(self.estimate()))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold other into self (register-wise max); same as having added both streams."""
+        if other.p != self.p:
+            raise ValueError("cannot merge HyperLogLogs with different p")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+
+class DistinctSampler:
+    def __init__(self, capacity: int = 1 << 16):
+        self.capacity = capacity
+        self.level = 0
+        self.counts: Dict[int, int] = {}
+
+    def _keeps(self, h: int) -> bool:
+        # Keep keys whose lowest `level` hash bits are all zero: a 2**-level sample
+        return h & ((1 << self.level) - 1) == 0
+
+    def add_hash(self, h: int):
+        if not self._keeps(h):
+            return
+        counts = self.counts
+        counts[h] = counts.get(h, 0) + 1
+        while len(counts) > self.capacity:
+            self.level += 1
+            self.counts = counts = {k: c for k, c in counts.items() if self._keeps(k)}
+
+    def add(self, key: Union[str, bytes]):
+        self.add_hash(hash64(key))
+
+    def merge(self, other: "DistinctSampler") -> "DistinctSampler":
+        """Fold other into self: both samples are cut down to the coarser level, then counts add up."""
+        self.level = max(self.level, other.level)
+        counts = {k: c for k, c in self.counts.items() if self._keeps(k)}
+        for k, c in other.counts.items():
+            if self._keeps(k):
+                counts[k] = counts.get(k, 0) + c
+        self.counts = counts
+        while len(self.counts) > self.capacity:
+            self.level += 1
+            self.counts = {k: c for k, c in self.counts.items() if self._keeps(k)}
+        return self
+
+    @property
+    def scale(self) -> int:
+        return 1 << self.level
+
+    def repeated_keys(self) -> float:
+        """Estimated number of distinct keys seen more than once."""
+        return self.scale * sum(1 for c in self.counts.values() if c > 1)
+
+    def extra_occurrences(self) -> float:
+        """Estimated number of occurrences beyond each key's first."""
+        return self.scale * sum(c - 1 for c in self.counts.values())
+
+    def distinct(self) -> float:
+        return self.scale * len(self.counts)
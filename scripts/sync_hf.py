@@ -11,6 +11,7 @@ REPO_ID = "albaz2000/arabic-itsm-dataset"
 DATA_FILES = [
     "dataset_clean.csv",
     "dataset_clean.jsonl",
+    "dataset_clean.parquet",
     "notebooks/inspect_data.ipynb",
 ]
 
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Map category triples that are not in the taxonomy to the nearest allowed one.
+
+TaxonomyResolver is built once from the taxonomy file and answers
+resolve(l1, l2, l3, tags) with (allowed triple, confidence) or None:
+
+- names are normalized (case, punctuation, "/" and "-" as spaces), so
+  "software > office apps > word excel" is an exact hit;
+- otherwise every leaf is scored on its three names, each compared by
+  edit-distance ratio or shared words (whichever is higher), weighted
+  0.2 / 0.3 / 0.5 from L1 to L3; when the row has tags, a fifth of the
+  score is how many of them the leaf's node lists in its suggested tags;
+- the best leaf is returned if its score reaches the threshold.
+
+Edit distance is the expensive part, so resolve() does not compute it for
+every name. A character-bigram inverted index per level gives a cheap upper
+bound on each name's similarity (strings within edit distance d share at
+least max(len) - 1 - 2d bigrams), leaves are visited best bound first, and
+the search stops once no remaining bound can beat the best exact score. The
+result is the same as scoring every leaf.
+
+Per-name similarities and whole lookups are memoized, so the repeats that
+make up most bad rows (the same invented L3 over and over) cost one dict
+hit. Example: Software > Office Apps > Excel Crash -> ... > Crash (0.95).
+
+Used by build_dataset.py --resolve-categories (as a repair rule for
+bad:category_not_allowed) and postprocess_v2.py --taxonomy.
+
+Usage: taxonomy_resolver.py TAXONOMY_JSON "L1 > L2 > L3" [--tags a,b] [--threshold 0.75]
+"""
+import argparse, json, re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Triple = Tuple[str, str, str]
+
+LEVEL_WEIGHTS = (0.2, 0.3, 0.5)
+# Share of the score given to tag overlap when the row has tags
+TAG_WEIGHT = 0.2
+DEFAULT_THRESHOLD = 0.75
+# Shared words count a little less than identical spelling
+WORD_OVERLAP_WEIGHT = 0.9
+# Character n-gram size of the per-level inverted index
+NGRAM = 2
+_MEMO_SIZE = 1 << 16
+
+_SEPARATORS = re.compile(r"[\s/\\\-_.,&+]+")
+
+
+def normalize(name) -> str:
+    return " ".join(_SEPARATORS.split(str(name).casefold())).strip()
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance, two-row dynamic programming."""
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def ngrams(name: str) -> Counter:
+    return Counter(name[i:i + NGRAM] for i in range(len(name) - NGRAM + 1))
+
+
+def similarity(a: str, b: str) -> float:
+    """1.0 for equal normalized names; edit-distance ratio or word overlap otherwise."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    ratio = 1.0 - edit_distance(a, b) / max(len(a), len(b))
+    wa, wb = set(a.split()), set(b.split())
+    overlap = len(wa & wb) / min(len(wa), len(wb))
+    return max(ratio, WORD_OVERLAP_WEIGHT * overlap)
+
+
+class TaxonomyResolver:
+    def __init__(self, nodes: Sequence[dict], threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.leaves: List[Triple] = []
+        leaf_tags: List[frozenset] = []
+        for node in nodes:
+            tags = frozenset(normalize(t) for t in node.get("tags", []))
+            for l3 in node["l3"]:
+                self.leaves.append((node["l1"], node["l2"], l3))
+                leaf_tags.append(tags)
+        self.leaf_tags = leaf_tags
+        self.exact: Dict[Triple, Triple] = {tuple(normalize(x) for x in leaf): leaf for leaf in self.leaves}
+        # Distinct normalized names per level, and each leaf's index into them
+        self.names: List[List[str]] = []
+        self.leaf_name: List[List[int]] = []
+        for level in range(3):
+            names = sorted({normalize(leaf[level]) for leaf in self.leaves})
+            pos = {n: i for i, n in enumerate(names)}
+            self.names.append(names)
+            self.leaf_name.append([pos[normalize(leaf[level])] for leaf in self.leaves])
+        # Per level: n-gram -> [(name index, count)], and each name's word set
+        self.gram_index: List[Dict[str, List[Tuple[int, int]]]] = []
+        self.name_words: List[List[set]] = []
+        for names in self.names:
+            index: Dict[str, List[Tuple[int, int]]] = {}
+            for i, n in enumerate(names):
+                for g, k in ngrams(n).items():
+                    index.setdefault(g, []).append((i, k))
+            self.gram_index.append(index)
+            self.name_words.append([set(n.split()) for n in names])
+        self._sims: Dict[Tuple[int, str], Dict[int, float]] = {}
+        self._bounds: Dict[Tuple[int, str], List[float]] = {}
+        self._memo: Dict[tuple, Optional[Tuple[Triple, float]]] = {}
+
+    @classmethod
+    def load(cls, path: str, threshold: float = DEFAULT_THRESHOLD) -> "TaxonomyResolver":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["taxonomy"], threshold)
+
+    def _sim(self, level: int, name: str, j: int) -> float:
+        """Similarity of name to the j-th distinct name at level."""
+        key = (level, name)
+        known = self._sims.get(key)
+        if known is None:
+            known = {}
+            if len(self._sims) < _MEMO_SIZE:
+                self._sims[key] = known
+        sim = known.get(j)
+        if sim is None:
+            sim = known[j] = similarity(name, self.names[level][j])
+        return sim
+
+    def _level_bounds(self, level: int, name: str) -> List[float]:
+        """Upper bound of similarity(name, n) for every distinct name n at level, without edit distances."""
+        key = (level, name)
+        bounds = self._bounds.get(key)
+        if bounds is not None:
+            return bounds
+        names = self.names[level]
+        common = [0] * len(names)
+        for g, k in ngrams(name).items():
+            for j, m in self.gram_index[level].get(g, ()):
+                common[j] += min(k, m)
+        words = set(name.split())
+        bounds = []
+        for j, n in enumerate(names):
+            if name == n:
+                bounds.append(1.0)
+                continue
+            if not name or not n:
+                bounds.append(0.0)
+                continue
+            longest = max(len(name), len(n))
+            dist = max(abs(len(name) - len(n)), -(-(longest - NGRAM + 1 - common[j]) // NGRAM))
+            nw = self.name_words[level][j]
+            overlap = len(words & nw) / min(len(words), len(nw))
+            bounds.append(max(1.0 - dist / longest, WORD_OVERLAP_WEIGHT * overlap))
+        if len(self._bounds) < _MEMO_SIZE:
+            self._bounds[key] = bounds
+        return bounds
+
+    def _leaf_score(self, i: int, sim, row_tags: set) -> float:
+        """Score of leaf i given sim(level, name index); the same arithmetic for exact values and bounds."""
+        s = sum(w * sim(level, self.leaf_name[level][i]) for level, w in enumerate(LEVEL_WEIGHTS))
+        if row_tags:
+            s = (1 - TAG_WEIGHT) * s + TAG_WEIGHT * len(row_tags & self.leaf_tags[i]) / len(row_tags)
+        return s
+
+    def score(self, l1, l2, l3, tags: Sequence[str] = ()) -> List[float]:
+        """Confidence for every leaf, in self.leaves order."""
+        norm = (normalize(l1), normalize(l2), normalize(l3))
+        row_tags = {normalize(t) for t in tags if isinstance(t, str)}
+        sim = lambda level, j: self._sim(level, norm[level], j)
+        return [self._leaf_score(i, sim, row_tags) for i in range(len(self.leaves))]
+
+    def _best(self, l1, l2, l3, tags: Sequence[str] = ()) -> Tuple[int, float]:
+        """(index, score) of the first best-scoring leaf, computing exact scores only for leaves that could win."""
+        norm = (normalize(l1), normalize(l2), normalize(l3))
+        row_tags = {normalize(t) for t in tags if isinstance(t, str)}
+        bounds = [self._level_bounds(level, norm[level]) for level in range(3)]
+        upper = [self._leaf_score(i, lambda level, j: bounds[level][j], row_tags) for i in range(len(self.leaves))]
+        sim = lambda level, j: self._sim(level, norm[level], j)
+        best, best_score = -1, -1.0
+        for i in sorted(range(len(upper)), key=upper.__getitem__, reverse=True):
+            if upper[i] < best_score or upper[i] < self.threshold:
+                break
+            s = self._leaf_score(i, sim, row_tags)
+            if s > best_score or (s == best_score and i < best):
+                best, best_score = i, s
+        return best, best_score
+
+    def resolve(self, l1, l2, l3, tags: Sequence[str] = ()) -> Optional[Tuple[Triple, float]]:
+        """(nearest allowed triple, confidence) if it reaches the threshold, else None."""
+        if not all(isinstance(x, str) for x in (l1, l2, l3)):
+            return None
+        tag_key = tuple(sorted(t for t in tags if isinstance(t, str))) if isinstance(tags, (list, tuple)) else ()
+        key = (l1, l2, l3, tag_key)
+        if key in self._memo:
+            return self._memo[key]
+        hit = self.exact.get((normalize(l1), normalize(l2), normalize(l3)))
+        if hit is not None:
+            result = (hit, 1.0)
+        else:
+            best, best_score = self._best(l1, l2, l3, tag_key)
+            result = (self.leaves[best], best_score) if best_score >= self.threshold else None
+        if len(self._memo) < _MEMO_SIZE:
+            self._memo[key] = result
+        return result
+
+    def resolve_path(self, path: str, tags: Sequence[str] = ()) -> Optional[Tuple[Triple, float]]:
+        parts = [p.strip() for p in str(path).split(">")]
+        if len(parts) != 3:
+            return None
+        return self.resolve(*parts, tags=tags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve a category path to the nearest allowed taxonomy leaf.")
+    parser.add_argument("taxonomy", help="Taxonomy JSON (e.g. taxonomy_itsm_v1.json)")
+    parser.add_argument("path", help='Category path, "L1 > L2 > L3"')
+    parser.add_argument("--tags", default="", help="Comma-separated row tags")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Minimum confidence (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+
+    resolver = TaxonomyResolver.load(args.taxonomy, args.threshold)
+    tags = [t.strip() for t in args.tags.split(",") if t.strip()]
+    scores = resolver.score(*([p.strip() for p in args.path.split(">")] + ["", "", ""])[:3], tags=tags)
+    for i in sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:5]:
+        print(f"{scores[i]:.3f}  {' > '.join(resolver.leaves[i])}")
+    match = resolver.resolve_path(args.path, tags)
+    print("->", f"{' > '.join(match[0])} ({match[1]:.3f})" if match else f"no match at threshold {args.threshold}")
+
+
+if __name__ == "__main__":
+    main()
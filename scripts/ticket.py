@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Compact ticket records.
+
+Ticket (and its nested Labels) keep the schema fields in __slots__ instead
+of a per-row dict: a decoded ticket, strings included, takes about 21%
+less memory (~2.1 KB vs ~2.7 KB, tracemalloc). Both are full mutable
+mappings that behave like the dict they were decoded from:
+
+- a key missing from the source stays missing (`in`, get() and [] behave
+  as they would on the dict);
+- keys outside the schema are kept in a small side dict;
+- iteration follows the source key order, so to_dict() and
+  jsonl_io.dumps() give the exact JSON the dict would.
+
+validate_row / RowValidator, postprocess_v2.py and dedupe_variants.py all
+accept Ticket rows; decode_ticket() / iter_tickets() produce them from JSONL.
+
+Records only pay off when many rows are held at once. Decoding is about
+2x and field access about 2.3x slower than a dict, so the streaming
+scripts (postprocess_v2.py, dedupe_variants.py, run_pipeline.py), which
+hold one row at a time, decode to plain dicts. build_dataset.py keeps
+dicts as well: on a 300k-row non-stream build, Tickets cut peak RSS by
+only 5% (1313 -> 1251 MB) and added 25% to the run time.
+"""
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Tuple
+
+from jsonl_io import loads
+
+TICKET_KEYS = (
+    "ticket_id", "created_at", "updated_at", "channel", "model",
+    "dialect", "title_ar", "description_ar",
+    "category_level_1", "category_level_2", "category_level_3", "category_path",
+    "tags", "labels_json",
+    "impact", "urgency", "priority", "sentiment",
+)
+LABEL_KEYS = ("l1", "l2", "l3", "tags")
+
+# Record classes, for a cheap "is this value a nested record" test
+_RECORD_TYPES = set()
+
+# Key orders are shared between records; real data only has a handful
+_ORDERS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+_MAX_ORDERS = 1024
+
+
+def _shared(order: Tuple[str, ...]) -> Tuple[str, ...]:
+    cached = _ORDERS.get(order)
+    if cached is not None:
+        return cached
+    if len(_ORDERS) < _MAX_ORDERS:
+        _ORDERS[order] = order
+    return order
+
+
+class SlotRecord(MutableMapping):
+    """Mapping over __slots__ fields; unset slots are missing keys."""
+
+    FIELDS: Tuple[str, ...] = ()
+    _FIELD_SET: frozenset = frozenset()
+    __slots__ = ("_order", "_extra")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+        _RECORD_TYPES.add(cls)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "SlotRecord":
+        rec = cls.__new__(cls)
+        fields = cls._FIELD_SET
+        extra = None
+        for k, v in d.items():
+            if k in fields:
+                setattr(rec, k, v)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[k] = v
+        rec._order = _shared(tuple(d))
+        rec._extra = extra
+        return rec
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self:
+            self._order = _shared(self._order + (key,))
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        if key in self._FIELD_SET:
+            delattr(self, key)
+        else:
+            del self._extra[key]
+        self._order = _shared(tuple(k for k in self._order if k != key))
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._FIELD_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._FIELD_SET:
+            return getattr(self, key, default)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._order)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in source key order, nested records included."""
+        fields, extra = self._FIELD_SET, self._extra
+        out = {}
+        for k in self._order:
+            v = getattr(self, k) if k in fields else extra[k]
+            out[k] = v.to_dict() if type(v) in _RECORD_TYPES else v
+        return out
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Labels(SlotRecord):
+    FIELDS = LABEL_KEYS
+    __slots__ = LABEL_KEYS
+
+
+class Ticket(SlotRecord):
+    FIELDS = TICKET_KEYS
+    __slots__ = TICKET_KEYS
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Ticket":
+        rec = super().from_dict(d)
+        lj = d.get("labels_json")
+        if type(lj) is dict:
+            rec.labels_json = Labels.from_dict(lj)
+        return rec
+
+
+def decode_ticket(line: str) -> Any:
+    """Parse a JSONL line; JSON objects become Tickets, anything else is returned as parsed."""
+    obj = loads(line)
+    return Ticket.from_dict(obj) if type(obj) is dict else obj
+
+
+def iter_tickets(path: str) -> Iterator[Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield decode_ticket(line)
+
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Random access to a clean JSONL dataset by ticket_id.
+
+The dataset file is memory-mapped and looked up through a companion index
+(dataset_clean.idx next to dataset_clean.jsonl by default): a small header
+followed by (blake2b-64 of ticket_id, byte offset) pairs sorted by hash. The
+index is memory-mapped too, so opening a store reads nothing up front and a
+lookup is a binary search plus one line read. Hash collisions are resolved by
+checking the ticket_id of each candidate line.
+
+build_dataset.py writes the index next to its clean JSONL (--out-index); a
+missing or stale index (the JSONL's size or mtime differs from the ones it
+recorded) is rebuilt on open.
+
+Usage: ticket_store.py DATASET_JSONL TICKET_ID [TICKET_ID ...]
+       ticket_store.py --build DATASET_JSONL [INDEX]
+"""
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from jsonl_io import loads
+
+INDEX_MAGIC = b"TIDX0002"
+# magic, size and mtime_ns of the indexed JSONL, number of entries
+INDEX_HEADER = struct.Struct("<8sQQQ")
+INDEX_DTYPE = np.dtype([("hash", "<u8"), ("offset", "<u8")])
+
+_TICKET_ID_RE = re.compile(rb'"ticket_id"\s*:\s*"([^"\\]*)"')
+
+
+def ticket_hash(ticket_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(ticket_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def default_index_path(jsonl_path: str) -> str:
+    return os.path.splitext(jsonl_path)[0] + ".idx"
+
+
+def line_ticket_id(line: bytes) -> Optional[str]:
+    """ticket_id of a JSONL line, peeked without parsing when unambiguous."""
+    ids = _TICKET_ID_RE.findall(line)
+    if len(ids) == 1 and line.count(b'"ticket_id"') == 1:
+        return ids[0].decode("utf-8")
+    try:
+        tid = loads(line).get("ticket_id")
+    except Exception:
+        return None
+    return tid if isinstance(tid, str) else None
+
+
+def iter_lines(buf) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line without newline) for every non-blank line of a bytes-like buffer."""
+    pos, end = 0, len(buf)
+    while pos < end:
+        nl = buf.find(b"\n", pos)
+        if nl < 0:
+            nl = end
+        line = buf[pos:nl]
+        if line.strip():
+            yield pos, line
+        pos = nl + 1
+
+
+def build_index(jsonl_path: str, index_path: Optional[str] = None) -> int:
+    """Write the ticket_id index for jsonl_path; returns the number of entries."""
+    index_path = index_path or default_index_path(jsonl_path)
+    st = os.stat(jsonl_path)
+    size = st.st_size
+    # Typed buffers: 8 bytes per value instead of a Python int per value
+    hashes, offsets = array("Q"), array("Q")
+    if size:
+        with open(jsonl_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            for off, line in iter_lines(buf):
+                tid = line_ticket_id(line)
+                if tid is not None:
+                    hashes.append(ticket_hash(tid))
+                    offsets.append(off)
+
+    entries = np.empty(len(hashes), dtype=INDEX_DTYPE)
+    entries["hash"] = np.frombuffer(hashes, dtype="<u8")
+    entries["offset"] = np.frombuffer(offsets, dtype="<u8")
+    del hashes, offsets
+    entries.sort(order=("hash", "offset"))
+
+    tmp = index_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, size, st.st_mtime_ns, len(entries)))
+        f.write(entries.tobytes())
+    os.replace(tmp, index_path)
+    return len(entries)
+
+
+def read_index_header(index_path: str) -> Optional[Tuple[int, int, int]]:
+    """(indexed JSONL size, its mtime_ns, entry count), or None if the file is not a valid index."""
+    try:
+        with open(index_path, "rb") as f:
+            head = f.read(INDEX_HEADER.size)
+    except OSError:
+        return None
+    if len(head) != INDEX_HEADER.size:
+        return None
+    magic, size, mtime_ns, count = INDEX_HEADER.unpack(head)
+    if magic != INDEX_MAGIC or os.path.getsize(index_path) != INDEX_HEADER.size + count * INDEX_DTYPE.itemsize:
+        return None
+    return size, mtime_ns, count
+
+
+class TicketStore:
+    """Read-only, memory-mapped view of a clean JSONL dataset keyed by ticket_id.
+
+    The index is trusted when its recorded JSONL size and mtime match the
+    file on disk; otherwise (or when it is missing) it is rebuilt first.
+    """
+
+    def __init__(self, jsonl_path: str, index_path: Optional[str] = None):
+        self.jsonl_path = jsonl_path
+        self.index_path = index_path or default_index_path(jsonl_path)
+        st = os.stat(jsonl_path)
+        size = st.st_size
+
+        header = read_index_header(self.index_path)
+        if header is None or header[:2] != (size, st.st_mtime_ns):
+            build_index(jsonl_path, self.index_path)
+            header = read_index_header(self.index_path)
+        count = header[2]
+
+        self._file = open(jsonl_path, "rb")
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if count:
+            entries = np.memmap(self.index_path, dtype=INDEX_DTYPE, mode="r", offset=INDEX_HEADER.size, shape=(count,))
+        else:
+            entries = np.empty(0, dtype=INDEX_DTYPE)
+        self._hashes = entries["hash"]
+        self._offsets = entries["offset"]
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, ticket_id: object) -> bool:
+        return isinstance(ticket_id, str) and self.offset(ticket_id) is not None
+
+    def __getitem__(self, ticket_id: str) -> Dict[str, Any]:
+        ticket = self.get(ticket_id)
+        if ticket is None:
+            raise KeyError(ticket_id)
+        return ticket
+
+    def _line(self, offset: int) -> bytes:
+        end = self._buf.find(b"\n", offset)
+        return self._buf[offset:end if end >= 0 else len(self._buf)]
+
+    def offset(self, ticket_id: str) -> Optional[int]:
+        """Byte offset of the line holding ticket_id, or None."""
+        h = np.uint64(ticket_hash(ticket_id))
+        lo = int(np.searchsorted(self._hashes, h, side="left"))
+        hi = int(np.searchsorted(self._hashes, h, side="right"))
+        for i in range(lo, hi):
+            off = int(self._offsets[i])
+            if line_ticket_id(self._line(off)) == ticket_id:
+                return off
+        return None
+
+    def raw(self, ticket_id: str) -> Optional[bytes]:
+        """The ticket's JSONL line (without newline), or None."""
+        off = self.offset(ticket_id)
+        return None if off is None else self._line(off)
+
+    def get(self, ticket_id: str, default: Any = None) -> Any:
+        line = self.raw(ticket_id)
+        return default if line is None else loads(line)
+
+    def ticket_ids(self) -> Iterator[str]:
+        """Every indexed ticket_id, in file order."""
+        for off in np.sort(self._offsets).tolist():
+            yield line_ticket_id(self._line(off))
+
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._file.close()
+
+    def __enter__(self) -> "TicketStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "--build":
+        jsonl_path = sys.argv[2]
+        index_path = sys.argv[3] if len(sys.argv) > 3 else default_index_path(jsonl_path)
+        n = build_index(jsonl_path, index_path)
+        print(f"Indexed {n} tickets -> {index_path}")
+        return
+    if len(sys.argv) < 3:
+        print(__doc__.strip().split("\n\n")[-1], file=sys.stderr)
+        sys.exit(2)
+
+    missing = 0
+    with TicketStore(sys.argv[1]) as store:
+        for tid in sys.argv[2:]:
+            line = store.raw(tid)
+            if line is None:
+                print(f"Not found: {tid}", file=sys.stderr)
+                missing += 1
+            else:
+                sys.stdout.write(line.decode("utf-8") + "\n")
+    sys.exit(1 if missing else 0)
+
+
+if __name__ == "__main__":
+    main()